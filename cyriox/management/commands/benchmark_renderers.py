@@ -0,0 +1,89 @@
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from cyriox.renderers import FastJSONRenderer, StreamingListMixin, dumps
+
+
+def sample_rows(count):
+    """Rows shaped like the order list, with the types the encoders treat differently."""
+    now = timezone.now()
+    distributor = uuid.uuid4()
+    return [
+        {
+            'id': pk,
+            'distributor': distributor,
+            'customer_name': f"Customer {pk} \u00e9\u2028",
+            'customer_email': f"customer{pk}@example.com",
+            'status': 'pending',
+            'payment_status': 'unpaid',
+            'tracking_number': f"TRK{pk:09d}",
+            'estimated_delivery': (now + timedelta(days=3)).date(),
+            'created_at': now,
+            'updated_at': now.isoformat(),
+            'items': [
+                {'id': pk * 10 + line, 'product': line, 'product_name': f"Product {line}", 'quantity': line + 1, 'price': '12.50'}
+                for line in range(3)
+            ],
+            'total_amount': Decimal('37.50') * pk,
+            'item_count': 3,
+        }
+        for pk in range(1, count + 1)
+    ]
+
+
+class RowSerializer:
+    """Stands in for a DRF serializer, the rows are already primitive."""
+
+    def to_representation(self, row):
+        return row
+
+
+def measure(render):
+    tracemalloc.start()
+    started = time.perf_counter()
+    output = render()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return output, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = "Compare render time and peak memory of the stdlib, orjson and streaming JSON renderers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        rows = sample_rows(options["rows"])
+        envelope = {'next': None, 'previous': None, 'results': []}
+
+        def stream():
+            # Chunks are handed to the server one at a time, only their total size is kept.
+            size = 0
+            for chunk in StreamingListMixin().stream_rows(RowSerializer(), rows, envelope):
+                size += len(chunk)
+            return size
+
+        page = dict(envelope, results=rows)
+        expected, *stdlib = measure(lambda: JSONRenderer().render(page))
+        fast, *orjson = measure(lambda: FastJSONRenderer().render(page))
+        streamed_size, *streamed = measure(stream)
+
+        joined = b''.join(StreamingListMixin().stream_rows(RowSerializer(), rows, envelope))
+        if fast != expected or joined != expected or streamed_size != len(expected):
+            raise CommandError("Rendered output differs from JSONRenderer.")
+        if dumps(rows[0]) != JSONRenderer().render(rows[0]):
+            raise CommandError("Row encoding differs from JSONRenderer.")
+
+        self.stdout.write(f"{len(rows)} rows, {len(expected)} bytes")
+        for name, (elapsed, peak) in (("stdlib", stdlib), ("orjson", orjson), ("streaming", streamed)):
+            self.stdout.write(f"{name:<10} {elapsed * 1000:9.1f} ms {peak / 1024:10.0f} KiB peak")
+        self.stdout.write(self.style.SUCCESS("Output is byte-identical."))
@@ -0,0 +1,129 @@
+import base64
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page number pagination, with keyset paging when the client sends ?cursor=.
+
+    Keyset pages filter on the view's cursor_ordering, e.g. ("-created_at", "-id"),
+    so page 5,000 costs the same index seek as page 1, new rows never shift a page
+    and no COUNT(*) is issued. Page number requests can skip the count with ?count=false.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_page_size = 20
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.mode = 'page'
+        if self.cursor_query_param in request.query_params:
+            self.mode = 'cursor'
+            return self.paginate_keyset(queryset, request, view)
+        if request.query_params.get(self.count_query_param) == 'false' and self.get_page_size(request):
+            self.mode = 'uncounted'
+            return self.paginate_uncounted(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_cursor_page_size(self, request):
+        return self.get_page_size(request) or self.cursor_page_size
+
+    def paginate_keyset(self, queryset, request, view):
+        ordering = tuple(getattr(view, 'cursor_ordering', ('-id',)))
+        fields = [name.lstrip('-') for name in ordering]
+        page_size = self.get_cursor_page_size(request)
+
+        queryset = queryset.order_by(*ordering)
+        position = self.decode_cursor(request.query_params[self.cursor_query_param], queryset.model, fields)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_position = [getattr(rows[-1], field) for field in fields] if self.has_next else None
+        return rows
+
+    def paginate_uncounted(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound("Invalid page.")
+        if self.page_number < 1:
+            raise NotFound("Invalid page.")
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    @staticmethod
+    def after(ordering, position):
+        """
+        Rows that come after position: a <= x AND ((a < x) OR (a = x AND b < y) ...) for
+        descending keys. The OR alone cannot seek the index, the bound on the leading key
+        lets the database start reading at the position instead of skipping every row before it.
+        """
+        condition = Q()
+        equal = {}
+        for name, value in zip(ordering, position):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        name, value = ordering[0], position[0]
+        bound = Q(**{f"{name.lstrip('-')}__{'lte' if name.startswith('-') else 'gte'}": value})
+        return bound & condition
+
+    @staticmethod
+    def encode_cursor(position):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor, model, fields):
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(fields):
+                raise ValueError
+            return [model._meta.get_field(field).to_python(value) for field, value in zip(fields, values)]
+        except Exception:
+            raise NotFound("Invalid cursor.")
+
+    def get_next_link(self):
+        if self.mode == 'page':
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.mode == 'cursor':
+            return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.mode == 'page':
+            return super().get_previous_link()
+        if self.mode == 'cursor' or self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.mode == 'page':
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
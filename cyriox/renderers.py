@@ -0,0 +1,131 @@
+import math
+from decimal import Decimal
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib renderer is used instead
+    orjson = None
+
+_encoder = JSONEncoder()
+# Types that are encoded the same by orjson and the stdlib encoder.
+_LEAVES = frozenset({str, int, bool, type(None)})
+
+
+def _same_float(value):
+    # Outside this range repr() switches to exponent notation and orjson does not,
+    # NaN and infinity must raise as they do with the strict stdlib encoder.
+    return math.isfinite(value) and (not value or 1e-4 <= abs(value) < 1e16)
+
+
+def _default(obj):
+    """DRF's encoding for types orjson does not handle itself, or handles differently."""
+    if isinstance(obj, Decimal):
+        value = float(obj)
+        if not _same_float(value):
+            raise TypeError("Float is rendered differently by orjson.")
+        return value
+    return _encoder.default(obj)
+
+
+def _floats_match(data):
+    """
+    Whether every native float in data, dict keys included, encodes the same with orjson.
+    orjson writes floats itself without calling default, so they are checked up front.
+    Containers holding only strings, ints and None are cleared by type in one pass.
+    """
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            if not _LEAVES.issuperset(map(type, obj)):
+                stack.extend(obj)
+            obj = obj.values()
+        elif not isinstance(obj, (list, tuple)):
+            if isinstance(obj, float) and not _same_float(obj):
+                return False
+            continue
+        if not _LEAVES.issuperset(map(type, obj)):
+            stack.extend(value for value in obj if type(value) not in _LEAVES)
+    return True
+
+
+def dumps(data):
+    """Encode data to the same bytes as DRF's compact, unicode JSONRenderer."""
+    if orjson is None or not _floats_match(data):
+        return JSONRenderer().render(data)
+    try:
+        ret = orjson.dumps(
+            data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+    except TypeError:
+        return JSONRenderer().render(data)
+    # JSONRenderer escapes the two line separators that are valid JSON but not valid JavaScript.
+    return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoded with orjson when it is installed.
+
+    The bytes are the same as the stdlib renderer's: dates, times and Decimals go
+    through DRF's encoder, and anything orjson cannot match exactly, such as floats
+    repr() writes with an exponent, NaN and infinity, falls back to it.
+    Indented output (the browsable API, ?indent=) always uses the stdlib renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if orjson is None or indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class StreamingListMixin:
+    """
+    ?stream=true sends a JSON list response row by row instead of rendering it in memory.
+
+    The bytes match the buffered response: each row is serialized and encoded on its
+    own and the page envelope is written around them. Unpaginated lists are read
+    from the database in chunks.
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        streamable = getattr(request, 'accepted_renderer', None) and request.accepted_renderer.format == 'json'
+        if request.query_params.get(self.stream_query_param) != 'true' or not streamable:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else queryset.iterator(chunk_size=self.stream_chunk_size)
+        serializer = self.get_serializer()
+        envelope = self.get_paginated_response([]).data if page is not None else None
+        return StreamingHttpResponse(
+            self.stream_rows(serializer, rows, envelope), content_type=request.accepted_renderer.media_type
+        )
+
+    def stream_rows(self, serializer, rows, envelope=None):
+        if envelope is None:
+            yield from self.stream_array(serializer, rows)
+            return
+        for index, (key, value) in enumerate(envelope.items()):
+            yield (b'{' if index == 0 else b',') + dumps(key) + b':'
+            if key == 'results':
+                yield from self.stream_array(serializer, rows)
+            else:
+                yield dumps(value)
+        yield b'}'
+
+    @staticmethod
+    def stream_array(serializer, rows):
+        yield b'['
+        for index, row in enumerate(rows):
+            yield (b',' if index else b'') + dumps(serializer.to_representation(row))
+        yield b']'
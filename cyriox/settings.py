@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
 
+    'cyriox',
     'user',
     'distributor',
     "notification",
@@ -150,6 +151,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'cyriox.wsgi.application'
 
+# Minutes a cart item holds its stock before the reservation expires
+CART_RESERVATION_MINUTES = int(os.getenv("CART_RESERVATION_MINUTES", 15))
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels.layers.InMemoryChannelLayer",  # Use Redis in production
@@ -157,6 +161,43 @@ CHANNEL_LAYERS = {
 }
 
 
+# Response cache, pick locmem, file or redis (any Redis-compatible server) with CACHE_BACKEND
+CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "cyriox"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", "/var/tmp/cyriox_cache"),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/1"),
+}
+CACHE_BACKEND, CACHE_DEFAULT_LOCATION = CACHE_BACKENDS[os.getenv("CACHE_BACKEND", "locmem")]
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", CACHE_DEFAULT_LOCATION),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300))
+
+# Seconds a dashboard summary is served before a request refreshes it
+DASHBOARD_MAX_AGE = int(os.getenv("DASHBOARD_MAX_AGE", 60))
+
+# Reorder point forecasting: days of sales history, supplier lead time and days between orders
+REORDER_HISTORY_DAYS = int(os.getenv("REORDER_HISTORY_DAYS", 56))
+REORDER_LEAD_TIME_DAYS = int(os.getenv("REORDER_LEAD_TIME_DAYS", 7))
+REORDER_REVIEW_DAYS = int(os.getenv("REORDER_REVIEW_DAYS", 14))
+# Standard deviations of demand held as safety stock, 1.65 is a 95% service level
+REORDER_SERVICE_FACTOR = float(os.getenv("REORDER_SERVICE_FACTOR", 1.65))
+
+# Minutes a Paystack transaction may stay pending before reconciliation verifies it
+PAYSTACK_RECONCILE_AFTER_MINUTES = int(os.getenv("PAYSTACK_RECONCILE_AFTER_MINUTES", 30))
+# Verify calls reconciliation keeps in flight at once
+PAYSTACK_RECONCILE_CONCURRENCY = int(os.getenv("PAYSTACK_RECONCILE_CONCURRENCY", 50))
+# Hours a payment init response is replayed for repeats of its Idempotency-Key
+IDEMPOTENCY_KEY_HOURS = int(os.getenv("IDEMPOTENCY_KEY_HOURS", 24))
+# Seconds a repeat waits for the first request with its key before answering 409
+IDEMPOTENCY_WAIT_SECONDS = int(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 10))
+
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
@@ -180,6 +221,10 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'cyriox.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 # Password validation
@@ -0,0 +1,43 @@
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from .renderers import dumps
+
+
+class DumpsTests(SimpleTestCase):
+    """dumps writes the same bytes as DRF's JSONRenderer, or raises where it raises."""
+
+    def assertSameBytes(self, data):
+        self.assertEqual(dumps(data), JSONRenderer().render(data))
+
+    def test_floats(self):
+        for value in (0.0, 1.0, -2.5, 0.0001, 123.456, 1e15, 1e-5, 1e-7, 1e16, -2.5e-5, 1e300):
+            with self.subTest(value):
+                self.assertSameBytes({'value': value, 'nested': [{'values': (value,)}]})
+
+    def test_float_keys(self):
+        self.assertSameBytes({1e-7: 'small', 1.5: 'plain'})
+
+    def test_non_finite_floats(self):
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.subTest(value):
+                with self.assertRaises(ValueError):
+                    dumps([{'value': value}])
+
+    def test_decimals(self):
+        for value in (Decimal('37.50'), Decimal('1E-7'), Decimal('1E+16')):
+            with self.subTest(value):
+                self.assertSameBytes({'value': value})
+
+    def test_other_types(self):
+        self.assertSameBytes({
+            'id': uuid.UUID(int=1),
+            'at': datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc),
+            'text': 'café    ',
+            'empty': None,
+            'flag': True,
+        })
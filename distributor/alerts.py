@@ -0,0 +1,43 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from notification.notify import notify
+from .models import Product
+
+
+def queue_stock_check(product_ids):
+    """Check these products' stock levels once the current transaction commits."""
+    product_ids = set(product_ids)
+    # An alert that fails to go out must not fail the stock change that caused it.
+    transaction.on_commit(lambda: check_stock_levels(product_ids), robust=True)
+
+
+def check_stock_levels(product_ids):
+    """Alert distributors about products that fell to their reorder threshold, once per crossing."""
+    products = Product.objects.filter(pk__in=product_ids).annotate(
+        threshold=Coalesce('reorder_threshold', 'category__reorder_threshold')
+    )
+    with transaction.atomic():
+        # Re-arm products that recovered so their next drop alerts again.
+        Product.objects.filter(
+            pk__in=products.filter(low_stock_alerted=True).filter(Q(threshold__isnull=True) | Q(stock__gt=F('threshold'))).values('pk')
+        ).update(low_stock_alerted=False)
+
+        crossed = list(
+            products.select_for_update(of=('self',))
+            .filter(low_stock_alerted=False, stock__lte=F('threshold'))
+            .values('pk', 'name', 'stock', 'distributor_id')
+        )
+        if not crossed:
+            return []
+        Product.objects.filter(pk__in=[product['pk'] for product in crossed]).update(low_stock_alerted=True)
+
+        per_distributor = defaultdict(list)
+        for product in crossed:
+            per_distributor[product['distributor_id']].append(f"{product['name']} ({product['stock']} left)")
+        notify(
+            (distributor_id, f"Low stock: {', '.join(lines)}")
+            for distributor_id, lines in per_distributor.items()
+        )
+    return [product['pk'] for product in crossed]
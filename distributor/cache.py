@@ -0,0 +1,133 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+from .fieldsets import requested_relations
+
+# Seconds a cached response lives when no tag invalidates it first.
+RESPONSE_CACHE_TIMEOUT = getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+RESPONSE_CACHE_ALIAS = getattr(settings, "RESPONSE_CACHE_ALIAS", "default")
+
+HITS_KEY = "response-cache:hits"
+MISSES_KEY = "response-cache:misses"
+
+
+def get_cache():
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+def _tag_key(tag):
+    return f"response-cache:tag:{tag}"
+
+
+def tag_versions(tags):
+    """Current version of each tag, a tag seen for the first time starts at a fresh version."""
+    cache = get_cache()
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, timeout=None)
+        versions.update(cache.get_many(list(missing)))
+    return [versions.get(key, 0) for key in keys]
+
+
+def invalidate(*tags):
+    """
+    Move the tags to a new version once the current transaction commits, which orphans
+    every response cached under the old one. Bumping before the commit would let a
+    reader cache the old rows under the new version.
+    """
+    tags = {tag for tag in tags if tag}
+    if not tags:
+        return
+
+    def bump():
+        version = time.time_ns()
+        get_cache().set_many({_tag_key(tag): version for tag in tags}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def owner_tags(model, owner_ids):
+    """
+    One tag per owning distributor or customer. The bare model tag is also on every
+    response of that model and is only bumped to drop all of them at once.
+    """
+    return [f"{model}:{owner_id}" for owner_id in set(owner_ids) if owner_id is not None]
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cache_stats():
+    cache = get_cache()
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+class CachedResponseMixin:
+    """
+    Cache the serialized data of list and retrieve responses.
+
+    Entries are keyed by view, user and full path (query params and page included) and
+    by the current version of their tags: cache_tags plus, when cache_scoped, the same
+    tags for the requesting user. Relations expanded with ?expand= add their model's
+    tags. Signals bump the tags a write touches.
+    """
+    cache_tags = ()
+    cache_scoped = True
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_tags(self):
+        # Expanded models are tagged by name, e.g. 'productcategory', or by name and owner.
+        tags = list(self.cache_tags) + [model._meta.model_name for _, model in requested_relations(self)]
+        if self.cache_scoped:
+            tags += [f"{tag}:{self.request.user.pk}" for tag in tags]
+        return tags
+
+    def is_cacheable(self, request):
+        # Without the user scope, owner tags of expanded rows (product:<distributor>) are not in the key.
+        return self.cache_scoped or not requested_relations(self)
+
+    def get_cache_key(self, request):
+        tags = self.get_cache_tags()
+        versions = tag_versions(tags)
+        raw = "|".join([
+            type(self).__name__, str(request.user.pk), request.get_full_path(),
+            request.headers.get("Accept", ""), *map(str, versions),
+        ])
+        return "response-cache:" + hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            _count(HITS_KEY)
+            return Response(cached, headers={"X-Cache": "HIT"})
+
+        _count(MISSES_KEY)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200 and isinstance(response, Response):
+            cache.set(key, response.data, RESPONSE_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
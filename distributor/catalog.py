@@ -0,0 +1,204 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .cache import invalidate, owner_tags
+from .ledger import movement, record_movements
+from .models import Product, ProductCategory
+from .search import get_backend
+
+FORMATS = ('csv', 'ndjson')
+EXPORT_FIELDS = ['id', 'sku', 'name', 'description', 'price', 'discount', 'stock', 'category', 'updated_at']
+UPDATE_FIELDS = ['name', 'description', 'price', 'discount', 'stock', 'category', 'updated_at']
+
+
+class ImportAborted(ValueError):
+    """The import stopped before the end of the file, report holds what the chunks before it imported."""
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+def guess_format(filename, default='csv'):
+    for fmt in FORMATS:
+        if filename and filename.lower().endswith(f'.{fmt}'):
+            return fmt
+    if filename and filename.lower().endswith('.jsonl'):
+        return 'ndjson'
+    return default
+
+
+def read_rows(stream, fmt):
+    """Yield (row number, dict) from a binary CSV or NDJSON stream without loading it whole."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=2):
+            yield number, row
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else {'__error__': "Invalid JSON object."}
+
+
+def _decimal(value, name, low, high=None):
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"{name} must be a number.")
+    if number < low or (high is not None and number > high):
+        raise ValueError(f"{name} is out of range.")
+    return number.quantize(Decimal('0.01'))
+
+
+def clean_row(row, categories):
+    """Validate one import row and return the product fields, or raise ValueError."""
+    if '__error__' in row:
+        raise ValueError(row['__error__'])
+    sku = str(row.get('sku') or '').strip()
+    name = str(row.get('name') or '').strip()
+    if not sku:
+        raise ValueError("sku is required.")
+    if not name:
+        raise ValueError("name is required.")
+    if len(sku) > 64 or len(name) > 255:
+        raise ValueError("sku or name is too long.")
+
+    category = categories.get(str(row.get('category') or '').strip())
+    if category is None:
+        raise ValueError(f"Unknown category {row.get('category')!r}.")
+
+    try:
+        stock = int(str(row.get('stock') or 0).strip())
+    except ValueError:
+        raise ValueError("stock must be a whole number.")
+    if stock < 0:
+        raise ValueError("stock cannot be negative.")
+
+    return {
+        'sku': sku,
+        'name': name,
+        'description': row.get('description') or None,
+        'price': _decimal(row.get('price'), 'price', 0),
+        'discount': _decimal(row.get('discount') or 0, 'discount', 0, 100),
+        'stock': stock,
+        'category_id': category,
+    }
+
+
+def _category_lookup():
+    """Category ids keyed by both id and name, the table is small enough to load once."""
+    lookup = {}
+    for pk, name in ProductCategory.objects.values_list('pk', 'name'):
+        lookup[str(pk)] = pk
+        lookup[name] = pk
+    return lookup
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_products(distributor, rows, chunk_size=500):
+    """
+    Upsert products keyed on (distributor, sku), one chunk at a time.
+
+    Each chunk costs one lookup, one bulk_create and one bulk_update. Bad rows are
+    reported by row number and do not stop the import. A file that cannot be decoded,
+    or a sku another import creates meanwhile, raises ImportAborted; the chunks before
+    it stay imported.
+    """
+    categories = _category_lookup()
+    report = {'created': 0, 'updated': 0, 'errors': []}
+
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            cleaned = {}
+            for number, row in chunk:
+                try:
+                    fields = clean_row(row, categories)
+                except ValueError as exc:
+                    report['errors'].append({'row': number, 'error': str(exc)})
+                    continue
+                # A sku repeated inside the file keeps its last row.
+                cleaned[fields['sku']] = fields
+
+            if not cleaned:
+                continue
+            with transaction.atomic():
+                # Locked until the chunk commits, a checkout taking stock in between would
+                # otherwise be overwritten by the imported stock and its ledger delta.
+                existing = {
+                    product.sku: product
+                    for product in Product.objects.select_for_update().filter(
+                        distributor=distributor, sku__in=list(cleaned)
+                    ).order_by('pk')
+                }
+                now = timezone.now()
+                created, updated, movements = [], [], []
+                for sku, fields in cleaned.items():
+                    product = existing.get(sku)
+                    if product is None:
+                        created.append(Product(distributor=distributor, **fields))
+                        continue
+                    movements.append(movement(product.pk, 'adjustment', fields['stock'] - product.stock, "Catalog import"))
+                    for name, value in fields.items():
+                        setattr(product, name, value)
+                    product.updated_at = now
+                    updated.append(product)
+
+                created = Product.objects.bulk_create(created)
+                Product.objects.bulk_update(updated, UPDATE_FIELDS)
+                movements.extend(movement(product.pk, 'restock', product.stock, "Opening stock") for product in created)
+                record_movements(movements)
+                get_backend().index(created + updated)
+                invalidate(*owner_tags('product', [distributor.pk]), f'order:{distributor.pk}')
+
+            report['created'] += len(created)
+            report['updated'] += len(updated)
+    except UnicodeDecodeError:
+        raise ImportAborted("The file is not valid UTF-8.", report)
+    except csv.Error as exc:
+        raise ImportAborted(f"The file is not valid CSV: {exc}", report)
+    except IntegrityError:
+        # The chunk was rolled back, importing the file again updates the products instead.
+        raise ImportAborted("Another import created some of these skus at the same time, upload the file again.", report)
+    return report
+
+
+def export_rows(queryset, fmt, chunk_size=2000):
+    """Yield the catalog as CSV or NDJSON text, reading the table and flushing output in chunks."""
+    rows = queryset.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(EXPORT_FIELDS)
+
+    for count, row in enumerate(rows, start=1):
+        record = dict(zip(EXPORT_FIELDS, row))
+        record['price'] = str(record['price'])
+        record['discount'] = str(record['discount'])
+        record['updated_at'] = record['updated_at'].isoformat()
+        if fmt == 'csv':
+            writer.writerow(record.values())
+        else:
+            buffer.write(json.dumps(record) + '\n')
+        if count % 500 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,76 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from .fieldsets import requested_relations
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for list and retrieve.
+
+    The validator is max(updated_at) and the row count of the filtered queryset, one
+    aggregate query. related_last_modified_fields adds the updated_at of related rows
+    the response embeds, e.g. 'items__product__updated_at', and so do the relations
+    expanded with ?expand=. A matching If-None-Match or If-Modified-Since gets a 304
+    before the page is loaded or serialized.
+    """
+    last_modified_field = 'updated_at'
+    related_last_modified_fields = ()
+
+    def list(self, request, *args, **kwargs):
+        state = self.get_validator_state(self.filter_queryset(self.get_queryset()))
+        return self.conditional_response(request, state, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        state = self.get_validator_state(self.filter_queryset(self.get_queryset()).filter(**lookup))
+        return self.conditional_response(request, state, super().retrieve, *args, **kwargs)
+
+    def get_related_last_modified_fields(self):
+        expanded = [
+            f'{lookup}__{self.last_modified_field}' for lookup, model in requested_relations(self)
+            if any(field.name == self.last_modified_field for field in model._meta.concrete_fields)
+        ]
+        return list(dict.fromkeys([*self.related_last_modified_fields, *expanded]))
+
+    def get_validator_state(self, queryset):
+        related = self.get_related_last_modified_fields()
+        fields = (self.last_modified_field, *related)
+        # Joining related rows repeats the outer ones, so they are counted once.
+        state = queryset.aggregate(
+            count=Count('pk', distinct=bool(related)),
+            **{f'last_modified_{n}': Max(field) for n, field in enumerate(fields)},
+        )
+        stamps = [state.pop(f'last_modified_{n}') for n in range(len(fields))]
+        state['last_modified'] = max(filter(None, stamps), default=None)
+        return state
+
+    def get_etag(self, request, state):
+        last_modified = state['last_modified'].isoformat() if state['last_modified'] else ''
+        key = f"{type(self).__name__}|{request.user.pk}|{request.get_full_path()}|{last_modified}|{state['count']}"
+        return quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return bool(last_modified and if_modified_since and int(last_modified.timestamp()) <= if_modified_since)
+
+    def conditional_response(self, request, state, render, *args, **kwargs):
+        etag = self.get_etag(request, state)
+        last_modified = state['last_modified']
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = render(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Responses are per user, shared caches must not keep them and clients must revalidate.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from notification.models import Notification
+from .models import DashboardSummary, Order, Product, SalesRecord
+from .rollups import TRUNCATE, period_start
+
+SUMMARY_FIELDS = [
+    'orders_by_status', 'low_stock_products', 'unpaid_invoices', 'unpaid_invoice_amount',
+    'unread_notifications', 'refreshed_at',
+]
+
+
+def refresh_summaries(distributor_ids=None):
+    """
+    Recompute the dashboard counters with one grouped query per counter and upsert them.
+
+    Without distributor_ids every distributor with products or orders is refreshed.
+    """
+    orders = Order.objects.all()
+    products = Product.objects.filter(low_stock_alerted=True)
+    # Invoices are only issued once an order is paid, so the money still owed sits on unpaid orders.
+    unpaid = Order.objects.filter(payment_status='unpaid').exclude(status='cancelled')
+    notifications = Notification.objects.filter(is_read=False)
+    if distributor_ids is not None:
+        orders = orders.filter(distributor__in=distributor_ids)
+        products = products.filter(distributor__in=distributor_ids)
+        unpaid = unpaid.filter(distributor__in=distributor_ids)
+        notifications = notifications.filter(user__in=distributor_ids)
+    else:
+        distributor_ids = get_user_model().objects.filter(
+            Q(products__isnull=False) | Q(orders__isnull=False)
+        ).values_list('pk', flat=True).distinct()
+
+    now = timezone.now()
+    summaries = {
+        pk: DashboardSummary(distributor_id=pk, orders_by_status={}, refreshed_at=now)
+        for pk in distributor_ids
+    }
+    for row in orders.values('distributor', 'status').annotate(count=Count('pk')):
+        summaries[row['distributor']].orders_by_status[row['status']] = row['count']
+    for row in products.values('distributor').annotate(count=Count('pk')):
+        summaries[row['distributor']].low_stock_products = row['count']
+    for row in unpaid.values('distributor').annotate(count=Count('pk'), amount=Sum('total_amount')):
+        summary = summaries[row['distributor']]
+        summary.unpaid_invoices = row['count']
+        summary.unpaid_invoice_amount = row['amount'] or Decimal('0.00')
+    for row in notifications.values('user').annotate(count=Count('pk')):
+        if row['user'] in summaries:
+            summaries[row['user']].unread_notifications = row['count']
+
+    DashboardSummary.objects.bulk_create(
+        summaries.values(), update_conflicts=True, unique_fields=['distributor'], update_fields=SUMMARY_FIELDS,
+    )
+    return len(summaries)
+
+
+def get_summary(distributor):
+    """The distributor's counters, refreshed first when older than DASHBOARD_MAX_AGE."""
+    summary = DashboardSummary.objects.filter(distributor=distributor).first()
+    if summary is None or summary.refreshed_at < timezone.now() - timedelta(seconds=settings.DASHBOARD_MAX_AGE):
+        refresh_summaries([distributor.pk])
+        summary = DashboardSummary.objects.get(distributor=distributor)
+    return summary
+
+
+def revenue(distributor, day=None):
+    """Paid revenue and order count for today, this week and this month, from the sales rollups."""
+    day = day or timezone.localdate()
+    buckets = {granularity: period_start(day, granularity) for granularity in TRUNCATE}
+    records = SalesRecord.objects.filter(distributor=distributor).filter(
+        reduce(or_, (Q(granularity=granularity, date=date) for granularity, date in buckets.items()))
+    ).values_list('granularity', 'total_sales', 'revenue')
+    totals = {granularity: {'orders': 0, 'revenue': Decimal('0.00')} for granularity in buckets}
+    for granularity, orders, amount in records:
+        totals[granularity] = {'orders': int(orders), 'revenue': amount}
+    return {'today': totals['day'], 'this_week': totals['week'], 'this_month': totals['month']}
@@ -0,0 +1,147 @@
+import sys
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_paths(value):
+    """'id,items.quantity' -> {'id': {}, 'items': {'quantity': {}}}"""
+    tree = {}
+    for path in filter(None, (part.strip() for part in value.split(','))):
+        node = tree
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def expanded_relations(model, expand, prefix=''):
+    """(lookup, related model) for every relation named in an ?expand= tree, nested ones included."""
+    relations = []
+    for name, nested in expand.items():
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.is_relation:
+            relations.append((prefix + name, field.related_model))
+            relations += expanded_relations(field.related_model, nested, f"{prefix}{name}__")
+    return relations
+
+
+def requested_relations(view):
+    """The relations a list or retrieve request to the view expands."""
+    expand = parse_paths(view.request.query_params.get('expand', ''))
+    return expanded_relations(view.get_serializer_class().Meta.model, expand) if expand else []
+
+
+class SparseFieldsMixin:
+    """
+    ?fields=, ?omit= and ?expand= for serializers answering a read request.
+
+    Nested fields are addressed with dots, e.g. ?fields=id,items.quantity. Meta.expandable_fields
+    maps a field to the serializer (or its name in the same module) that replaces it when expanded,
+    Meta.field_sources lists the model fields a method field reads.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.selection = kwargs.pop('selection', None)
+        super().__init__(*args, **kwargs)
+
+    def get_selection(self):
+        """(fields, omit, expand) trees, empty unless this is the root serializer of a GET."""
+        if self.selection is not None:
+            return self.selection
+        request = self.context.get('request')
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        if parent is not None or request is None or request.method not in SAFE_METHODS:
+            return {}, {}, {}
+        return tuple(parse_paths(request.query_params.get(param, '')) for param in ('fields', 'omit', 'expand'))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        only, omit, expand = self.get_selection()
+
+        for name, target in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expand:
+                if isinstance(target, str):
+                    target = getattr(sys.modules[type(self).__module__], target)
+                fields[name] = target(read_only=True)
+        if only:
+            fields = {name: field for name, field in fields.items() if name in only}
+        for name, nested in omit.items():
+            if not nested:
+                fields.pop(name, None)
+
+        for name, field in fields.items():
+            child = getattr(field, 'child', field)
+            if isinstance(child, SparseFieldsMixin):
+                child.selection = (only.get(name, {}), omit.get(name, {}), expand.get(name, {}))
+        return fields
+
+    def selected_columns(self, model, prefix=''):
+        """Columns to load and relations to join for the selected fields, and the nested serializers to prefetch."""
+        columns, joins, prefetches = {prefix + model._meta.pk.name}, set(), {}
+        sources = getattr(self.Meta, 'field_sources', {})
+        for name, field in self.fields.items():
+            child = getattr(field, 'child', field)
+            if name in sources:
+                columns.update(prefix + source for source in sources[name])
+                continue
+            if field.source == '*':
+                continue
+            path = field.source.split('.')
+            try:
+                model_field = model._meta.get_field(path[0])
+            except FieldDoesNotExist:
+                # Annotations and model methods.
+                continue
+            if not model_field.concrete:
+                prefetches[path[0]] = (model_field, child)
+            elif not model_field.is_relation:
+                columns.add(prefix + path[0])
+            else:
+                columns.add(prefix + path[0])
+                if isinstance(child, SparseFieldsMixin):
+                    # Expanded into a nested object loaded through the join.
+                    related_columns, related_joins, _ = child.selected_columns(
+                        model_field.related_model, f"{prefix}{path[0]}__"
+                    )
+                    columns |= related_columns
+                    joins |= related_joins | {prefix + path[0]}
+                elif len(path) > 1:
+                    columns.add(prefix + '__'.join(path))
+                    joins.add(prefix + path[0])
+        return columns, joins, prefetches
+
+    def prune_queryset(self, queryset, keep=()):
+        """Load only the columns, joins and prefetches the selected fields need."""
+        if not any(self.get_selection()):
+            return queryset
+        columns, joins, prefetches = self.selected_columns(queryset.model)
+
+        lookups = []
+        for lookup in queryset._prefetch_related_lookups:
+            name = getattr(lookup, 'prefetch_to', lookup).split('__')[0]
+            if name not in prefetches:
+                continue
+            model_field, child = prefetches[name]
+            if isinstance(lookup, Prefetch) and lookup.queryset is not None and isinstance(child, SparseFieldsMixin):
+                lookup = Prefetch(
+                    lookup.prefetch_through,
+                    queryset=child.prune_queryset(lookup.queryset, keep=(model_field.field.name,)),
+                    to_attr=lookup.to_attr,
+                )
+            lookups.append(lookup)
+
+        queryset = queryset.select_related(None).prefetch_related(None).only(*columns, *keep)
+        if joins:
+            queryset = queryset.select_related(*joins)
+        return queryset.prefetch_related(*lookups)
+
+
+class SparseQuerysetMixin:
+    """Hand the view's queryset to its serializer to drop unselected columns, joins and prefetches."""
+
+    def filter_queryset(self, queryset):
+        return self.get_serializer().prune_queryset(super().filter_queryset(queryset))
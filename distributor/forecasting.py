@@ -0,0 +1,97 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import Product, ReorderSuggestion, StockInventory
+
+RECENT_DAYS = 7
+SUGGESTION_FIELDS = [
+    'average_daily_demand', 'recent_daily_demand', 'demand_deviation', 'safety_stock',
+    'reorder_point', 'suggested_quantity', 'computed_at',
+]
+
+
+def day_bounds(start, days):
+    """Aware datetimes of local midnight from start through days later."""
+    midnight = timezone.make_aware(datetime.combine(start, time.min))
+    return [midnight + timedelta(days=offset) for offset in range(days + 1)]
+
+
+def daily_demand(product_ids, start, days):
+    """Units sold per product and day as a (products, days) array, product_ids sorted ascending."""
+    product_ids = np.asarray(product_ids)
+    demand = np.zeros((len(product_ids), days))
+    sales = StockInventory.objects.filter(action__in=('sale', 'cancellation'))
+    bounds = day_bounds(start, days)
+    # One grouped range query per day: each reads only its day through the timestamp index and
+    # needs no per-row date function, which on SQLite would be a Python callback per movement.
+    for day, (since, until) in enumerate(zip(bounds, bounds[1:])):
+        totals = list(
+            sales.filter(timestamp__gte=since, timestamp__lt=until)
+            .values('product').annotate(units=Sum(-F('delta'))).values_list('product', 'units')
+        )
+        if not totals:
+            continue
+        products, units = (np.asarray(column) for column in zip(*totals))
+        rows = np.searchsorted(product_ids, products)
+        # Products created after the catalog was read are left out.
+        known = (rows < len(product_ids)) & (product_ids[np.minimum(rows, len(product_ids) - 1)] == products)
+        demand[rows[known], day] = units[known]
+    # Cancellations are negative sales, a day only nets out below zero through data errors.
+    return np.clip(demand, 0, None)
+
+
+def reorder_points(demand, stock, lead_time, review, service_factor):
+    """Demand statistics and restock suggestion for every row of the demand matrix at once."""
+    average = demand.mean(axis=1)
+    recent = demand[:, -RECENT_DAYS:].mean(axis=1)
+    deviation = demand.std(axis=1)
+    safety = np.ceil(service_factor * deviation * np.sqrt(lead_time))
+    reorder_point = np.ceil(average * lead_time) + safety
+    # Order up to the demand of the lead time and the review period, on top of the safety stock.
+    target = np.ceil(average * (lead_time + review)) + safety
+    suggested = np.where(stock <= reorder_point, np.maximum(target - stock, 0), 0)
+    return average, recent, deviation, safety, reorder_point, suggested
+
+
+def compute_reorder_points(history_days=None, lead_time=None, review=None, service_factor=None, batch_size=2000):
+    """Recompute the reorder suggestion of every product from its sales ledger."""
+    history_days = history_days or settings.REORDER_HISTORY_DAYS
+    lead_time = lead_time or settings.REORDER_LEAD_TIME_DAYS
+    review = review or settings.REORDER_REVIEW_DAYS
+    service_factor = service_factor or settings.REORDER_SERVICE_FACTOR
+
+    products = list(Product.objects.order_by('pk').values_list('pk', 'stock'))
+    if not products:
+        return 0
+    product_ids = [pk for pk, _ in products]
+    stock = np.array([units for _, units in products], dtype=float)
+
+    today = timezone.localdate()
+    demand = daily_demand(product_ids, today - timedelta(days=history_days - 1), history_days)
+    columns = reorder_points(demand, stock, lead_time, review, service_factor)
+
+    now = timezone.now()
+    cents = Decimal('0.01')
+    suggestions = [
+        ReorderSuggestion(
+            product_id=pk,
+            average_daily_demand=Decimal(average).quantize(cents),
+            recent_daily_demand=Decimal(recent).quantize(cents),
+            demand_deviation=Decimal(deviation).quantize(cents),
+            safety_stock=int(safety),
+            reorder_point=int(point),
+            suggested_quantity=int(suggested),
+            computed_at=now,
+        )
+        for pk, average, recent, deviation, safety, point, suggested in zip(product_ids, *(c.tolist() for c in columns))
+    ]
+    with transaction.atomic():
+        ReorderSuggestion.objects.bulk_create(
+            suggestions, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['product'], update_fields=SUGGESTION_FIELDS,
+        )
+    return len(suggestions)
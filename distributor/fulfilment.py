@@ -0,0 +1,89 @@
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Sum, When
+from django.utils import timezone
+from notification.notify import notify
+from .cache import invalidate, owner_tags
+from .invoicing import mark_orders_paid
+from .ledger import movement, record_movements
+from .models import Order, OrderItem, Product
+from .rollups import record_sales
+
+# Statuses an order may move to from each status.
+TRANSITIONS = {
+    'pending': {'processing', 'cancelled'},
+    'processing': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+
+def can_transition(current, new):
+    return new == current or new in TRANSITIONS.get(current, set())
+
+
+def restock_orders(order_ids):
+    """Put the items of cancelled orders back in stock with one UPDATE and one ledger insert."""
+    lines = list(
+        OrderItem.objects.filter(order__in=order_ids).values('order', 'product').annotate(quantity=Sum('quantity'))
+    )
+    if not lines:
+        return
+    per_product = Counter()
+    for line in lines:
+        per_product[line['product']] += line['quantity']
+
+    Product.objects.filter(pk__in=list(per_product)).update(
+        stock=Case(
+            *(When(pk=pk, then=F('stock') + quantity) for pk, quantity in per_product.items()),
+            default=F('stock'),
+            output_field=PositiveIntegerField(),
+        ),
+        updated_at=timezone.now(),
+    )
+    record_movements(
+        movement(line['product'], 'cancellation', line['quantity'], f"Order {line['order']} cancelled")
+        for line in lines
+    )
+
+
+def transition_orders(orders, status, payment_method=None):
+    """
+    Move orders to a new status with one UPDATE, restocking and taking cancelled
+    sales off the rollups in bulk. Orders the state machine does not allow to move
+    are returned as rejected instead of failing the whole batch.
+
+    Passing a payment_method also marks the moved orders paid and queues their invoices.
+    """
+    with transaction.atomic():
+        locked = list(
+            orders.select_for_update().only('id', 'distributor_id', 'status', 'payment_status', 'total_amount', 'created_at')
+        )
+        moved = [order for order in locked if order.status != status and can_transition(order.status, status)]
+        rejected = {
+            order.pk: f"Cannot move a {order.status} order to {status}."
+            for order in locked if not can_transition(order.status, status)
+        }
+        ids = [order.pk for order in moved]
+        if not ids:
+            return ids, rejected
+
+        Order.objects.filter(pk__in=ids).update(status=status, updated_at=timezone.now())
+        if status == 'cancelled':
+            restock_orders(ids)
+            # QuerySet.update skips the Order signal that normally keeps the rollups in step.
+            record_sales([order for order in moved if order.payment_status == 'paid'], -1)
+        invalidate(*owner_tags('order', {order.distributor_id for order in moved}))
+
+        if payment_method is not None and status != 'cancelled':
+            mark_orders_paid(Order.objects.filter(pk__in=ids), payment_method)
+
+        per_distributor = defaultdict(int)
+        for order in moved:
+            per_distributor[order.distributor_id] += 1
+        notify(
+            (distributor_id, f"{count} order{'s' if count != 1 else ''} marked {status}.")
+            for distributor_id, count in per_distributor.items()
+        )
+    return ids, rejected
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .cache import invalidate, owner_tags
+from .models import Invoice, InvoiceJob, Order
+from .rollups import record_sales
+
+# Days between issuing an invoice and its due date.
+INVOICE_DUE_DAYS = 30
+
+
+def invoice_number(order_id):
+    return f"INV-{order_id:06d}"
+
+
+def enqueue_invoices(order_ids, payment_method='card'):
+    """Queue invoice generation, a second request for the same order is ignored."""
+    return InvoiceJob.objects.bulk_create(
+        [InvoiceJob(order_id=order_id, payment_method=payment_method) for order_id in order_ids],
+        ignore_conflicts=True,
+    )
+
+
+def generate_invoices(jobs):
+    """Create the invoices for a batch of jobs with one bulk insert, skipping orders that already have one."""
+    methods = {job.order_id: job.payment_method for job in jobs}
+    orders = Order.objects.filter(pk__in=list(methods), payment_status='paid', invoice__isnull=True)
+    today = timezone.now().date()
+    invalidate(*owner_tags('invoice', orders.values_list('distributor_id', flat=True).distinct()))
+    return Invoice.objects.bulk_create(
+        [
+            Invoice(
+                order_id=order_id,
+                invoice_number=invoice_number(order_id),
+                due_date=today + timedelta(days=INVOICE_DUE_DAYS),
+                total_amount=total_amount,
+                payment_status='paid',
+                payment_method=methods[order_id],
+            )
+            for order_id, total_amount in orders.values_list('pk', 'total_amount')
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def process_invoice_queue(batch_size=500, max_batches=None):
+    """Drain the invoice queue in batches and return how many jobs were handled."""
+    processed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            jobs = list(InvoiceJob.objects.order_by('id')[:batch_size])
+            if not jobs:
+                break
+            generate_invoices(jobs)
+            InvoiceJob.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+        processed += len(jobs)
+        batches += 1
+    return processed
+
+
+def mark_orders_paid(orders, payment_method='card'):
+    """Mark many orders paid with one UPDATE and queue their invoices with one insert."""
+    with transaction.atomic():
+        unpaid = list(
+            orders.filter(payment_status='unpaid').select_for_update().only(
+                'id', 'distributor_id', 'status', 'created_at', 'total_amount'
+            )
+        )
+        ids = [order.pk for order in unpaid]
+        Order.objects.filter(pk__in=ids).update(payment_status='paid', updated_at=timezone.now())
+        invalidate(*owner_tags('order', [order.distributor_id for order in unpaid]))
+        enqueue_invoices(ids, payment_method)
+        record_sales([order for order in unpaid if order.status != 'cancelled'])
+    return ids
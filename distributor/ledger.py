@@ -0,0 +1,145 @@
+from django.db import transaction
+from django.db.models import Exists, F, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .alerts import queue_stock_check
+from .cache import invalidate, owner_tags
+from .models import Product, StockInventory, StockSnapshot
+
+# Sign applied to the quantity of a movement recorded through the API.
+ACTION_SIGNS = {
+    'restock': 1,
+    'sale': -1,
+    'return': -1,
+    'adjustment': -1,
+    'cancellation': 1,
+}
+
+
+class InsufficientStock(ValueError):
+    pass
+
+
+def movement(product_id, action, delta, description=None):
+    """Unsaved ledger row, for bulk_create."""
+    return StockInventory(
+        product_id=product_id, action=action, quantity=abs(delta), delta=delta, description=description
+    )
+
+
+def record_movements(movements):
+    """Append ledger rows for stock changes that were already applied to Product.stock."""
+    movements = [m for m in movements if m.delta]
+    if not movements:
+        return []
+    created = StockInventory.objects.bulk_create(movements)
+    distributors = Product.objects.filter(pk__in={m.product_id for m in movements}).values_list(
+        'distributor_id', flat=True
+    ).distinct()
+    invalidate('stockinventory', *owner_tags('product', distributors))
+    queue_stock_check({m.product_id for m in movements})
+    return created
+
+
+def apply_movement(product, action, quantity, description=None):
+    """Change Product.stock and append the matching ledger row in one transaction."""
+    return apply_delta(product, action, ACTION_SIGNS[action] * quantity, description)
+
+
+def apply_delta(product, action, delta, description=None):
+    """Move Product.stock by a signed delta on top of the stored value and append the ledger row."""
+    with transaction.atomic():
+        products = Product.objects.filter(pk=product.pk)
+        if delta < 0:
+            products = products.filter(stock__gte=-delta)
+        if not products.update(stock=F('stock') + delta, updated_at=timezone.now()):
+            raise InsufficientStock(f"Not enough stock available for {product.name}.")
+        return StockInventory.objects.create(
+            product=product, action=action, quantity=abs(delta), delta=delta, description=description
+        )
+
+
+def _latest_snapshot(field, when=None):
+    snapshots = StockSnapshot.objects.filter(product=OuterRef('pk'))
+    if when is not None:
+        snapshots = snapshots.filter(taken_at__lte=when)
+    return Subquery(snapshots.order_by('-taken_at', '-id').values(field)[:1])
+
+
+def _tail_sum(after_field, upto_id=None, when=None):
+    tail = StockInventory.objects.filter(product=OuterRef('pk'), id__gt=OuterRef(after_field))
+    if upto_id is not None:
+        tail = tail.filter(id__lte=upto_id)
+    if when is not None:
+        tail = tail.filter(timestamp__lte=when)
+    tail = tail.values('product').annotate(total=Sum('delta')).values('total')
+    return Coalesce(Subquery(tail), Value(0), output_field=IntegerField())
+
+
+def with_ledger_balance(products, when=None, upto_id=None):
+    """
+    Annotate products with ledger_balance, the stock according to the ledger.
+
+    The balance starts from the newest snapshot and only sums the movements recorded
+    after it, so the cost depends on the tail rather than on the whole history.
+    """
+    products = products.annotate(
+        snapshot_balance=Coalesce(_latest_snapshot('balance', when), Value(0), output_field=IntegerField()),
+        snapshot_movement=Coalesce(_latest_snapshot('last_movement_id', when), Value(0), output_field=IntegerField()),
+    )
+    return products.annotate(
+        ledger_balance=F('snapshot_balance') + _tail_sum('snapshot_movement', upto_id, when)
+    )
+
+
+def stock_at(product, when):
+    """Stock of a product at a point in time."""
+    return with_ledger_balance(Product.objects.filter(pk=product.pk), when=when).values_list(
+        'ledger_balance', flat=True
+    ).get()
+
+
+def net_movement(product, start, end):
+    """Net stock change of a product between two points in time."""
+    return stock_at(product, end) - stock_at(product, start)
+
+
+def take_snapshots(chunk_size=2000):
+    """Write a snapshot for every product whose balance moved since its last snapshot."""
+    last_id = StockInventory.objects.aggregate(last=Max('id'))['last']
+    if last_id is None:
+        return 0
+    now = timezone.now()
+    moved = StockInventory.objects.filter(
+        product=OuterRef('pk'), id__gt=OuterRef('snapshot_movement'), id__lte=last_id
+    )
+    products = with_ledger_balance(Product.objects.all(), upto_id=last_id).filter(
+        Exists(moved)
+    ).values_list('pk', 'ledger_balance')
+
+    created = 0
+    batch = []
+    for pk, balance in products.iterator(chunk_size=chunk_size):
+        batch.append(StockSnapshot(product_id=pk, balance=balance, last_movement_id=last_id, taken_at=now))
+        if len(batch) >= chunk_size:
+            created += len(StockSnapshot.objects.bulk_create(batch))
+            batch = []
+    created += len(StockSnapshot.objects.bulk_create(batch))
+    return created
+
+
+def drifted_products():
+    """Products whose stock disagrees with the ledger, in one query."""
+    return with_ledger_balance(Product.objects.all()).exclude(stock=F('ledger_balance'))
+
+
+def reconcile(fix=False, chunk_size=2000):
+    """Report products out of step with the ledger, and append adjustments for them when asked to."""
+    drifted = list(drifted_products().values_list('pk', 'stock', 'ledger_balance'))
+    if fix:
+        for start in range(0, len(drifted), chunk_size):
+            record_movements(
+                movement(pk, 'adjustment', stock - balance, "Reconciliation")
+                for pk, stock, balance in drifted[start:start + chunk_size]
+            )
+    return drifted
@@ -0,0 +1,36 @@
+import time
+import uuid
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+@contextmanager
+def rolled_back():
+    """Run a benchmark on throwaway rows that are rolled back afterwards."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def make_user(role='Distributor'):
+    tag = uuid.uuid4().hex[:12]
+    return get_user_model().objects.create(username=f'bench-{tag}', email=f'bench-{tag}@example.com', role=role)
+
+
+def fake_request(user):
+    """Enough of a request for serializers that read context['request'].user."""
+    return SimpleNamespace(user=user, query_params={}, method='POST')
+
+
+def measure(run, repeat):
+    """Average seconds and queries of run() over repeat calls."""
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        elapsed = time.perf_counter() - started
+    return elapsed / repeat, len(queries) / repeat
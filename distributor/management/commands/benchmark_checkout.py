@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from distributor.models import Product, ProductCategory
+from distributor.serializers import CheckoutSerializer, OrderItemSerializer, OrderSerializer
+
+from ._benchmark import fake_request, make_user, measure, rolled_back
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare queries and throughput of orders/ plus one order-items/ call per line with one "
+        "orders/checkout/ call, for carts of several sizes. Runs on throwaway rows that are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 30])
+        parser.add_argument("--repeat", type=int, default=20, help="Orders placed per cart size and path.")
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            distributor = make_user()
+            category = ProductCategory.objects.create(name=f"Benchmark {distributor.username}")
+            products = Product.objects.bulk_create([
+                Product(name=f"Product {n}", price=10, stock=10 ** 6, category=category, distributor=distributor)
+                for n in range(max(options["sizes"]))
+            ])
+            request = fake_request(make_user(role='Customer'))
+
+            self.stdout.write(f"{'lines':>5} {'path':<22} {'queries':>8} {'ms/order':>9} {'orders/s':>9}")
+            for size in options["sizes"]:
+                lines = [{'product': product.pk, 'quantity': 1} for product in products[:size]]
+
+                def per_line():
+                    order = OrderSerializer(data={'customer_name': 'Bench', 'distributor': distributor.pk})
+                    order.is_valid(raise_exception=True)
+                    order = order.save(customer_email='bench@example.com')
+                    for line in lines:
+                        item = OrderItemSerializer(data={'order': order.pk, 'price': '10.00', **line})
+                        item.is_valid(raise_exception=True)
+                        item.save()
+
+                def checkout():
+                    serializer = CheckoutSerializer(data={'items': lines}, context={'request': request})
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save()
+
+                for name, run in (("orders + order-items", per_line), ("checkout", checkout)):
+                    seconds, queries = measure(run, options["repeat"])
+                    self.stdout.write(f"{size:>5} {name:<22} {queries:>8.0f} {seconds * 1000:>9.1f} {1 / seconds:>9.0f}")
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from distributor.models import Order, OrderItem, Product, ProductCategory
+from distributor.views import OrderViewSet, ProductViewSet
+
+from ._benchmark import make_user, measure, rolled_back
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare a poll of the product and order lists answered with a full 200, a 200 from the "
+        "response cache and a 304 revalidation: body bytes, queries, wall and CPU time per poll. "
+        "Runs on throwaway rows that are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200, help="Products and orders on the polled lists.")
+        parser.add_argument("--repeat", type=int, default=50, help="Polls per list and mode.")
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+
+        with rolled_back():
+            distributor = make_user()
+            category = ProductCategory.objects.create(name=f"Benchmark {distributor.username}")
+            products = Product.objects.bulk_create([
+                Product(name=f"Product {n}", price=10, stock=10 ** 6, category=category, distributor=distributor)
+                for n in range(options["rows"])
+            ])
+            orders = Order.objects.bulk_create([
+                Order(distributor=distributor, customer_name=f"Customer {n}", customer_email="bench@example.com")
+                for n in range(options["rows"])
+            ])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=1, price=product.price)
+                for order, product in zip(orders, products)
+            ])
+
+            def poll(view_class, **headers):
+                view = view_class.as_view({"get": "list"})
+                request = factory.get("/", HTTP_HOST="127.0.0.1", HTTP_ACCEPT="application/json", **headers)
+                force_authenticate(request, distributor)
+                response = view(request)
+                response.render()
+                return response
+
+            self.stdout.write(f"{'list':<9} {'mode':<11} {'status':>6} {'bytes':>9} {'queries':>8} {'ms/poll':>8} {'cpu ms':>7}")
+            for name, view_class in (("products", ProductViewSet), ("orders", OrderViewSet)):
+                uncached = type(f"Uncached{view_class.__name__}", (view_class,), {"is_cacheable": lambda self, request: False})
+                etag = poll(view_class)["ETag"]
+                modes = {
+                    "full": lambda: poll(uncached),
+                    "cached": lambda: poll(view_class),
+                    "revalidate": lambda: poll(view_class, HTTP_IF_NONE_MATCH=etag),
+                }
+                for mode, run in modes.items():
+                    response = run()
+                    started = time.process_time()
+                    seconds, queries = measure(run, options["repeat"])
+                    cpu = (time.process_time() - started) / options["repeat"]
+                    self.stdout.write(
+                        f"{name:<9} {mode:<11} {response.status_code:>6} {len(response.content):>9} "
+                        f"{queries:>8.0f} {seconds * 1000:>8.2f} {cpu * 1000:>7.2f}"
+                    )
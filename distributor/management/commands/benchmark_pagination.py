@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from cyriox.pagination import KeysetPagination
+from distributor.models import Order
+from distributor.views import OrderViewSet
+
+from ._benchmark import make_user, measure, rolled_back
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare page 1 and a deep page of the order list with page numbers, page numbers without "
+        "the count and keyset cursors. Runs on throwaway orders that are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page", type=int, default=5000, help="The deep page to compare with page 1.")
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        page, size = options["page"], options["page_size"]
+        view = SimpleNamespace(cursor_ordering=OrderViewSet.cursor_ordering)
+        factory = APIRequestFactory()
+
+        with rolled_back():
+            distributor = make_user()
+            for start in range(0, page * size, 10000):
+                Order.objects.bulk_create(
+                    Order(distributor=distributor, customer_name=f"Customer {n}", customer_email="bench@example.com")
+                    for n in range(start, min(start + 10000, page * size))
+                )
+            orders = Order.objects.filter(distributor=distributor).order_by(*view.cursor_ordering)
+            # The cursor a client holds after walking to the page before the deep one.
+            last = orders[(page - 1) * size - 1]
+            cursor = KeysetPagination.encode_cursor([last.created_at, last.id])
+
+            params = {
+                "page numbers": lambda number: {"page": number, "page_size": size},
+                "no count": lambda number: {"page": number, "page_size": size, "count": "false"},
+                "cursor": lambda number: {"cursor": "" if number == 1 else cursor, "page_size": size},
+            }
+            self.stdout.write(f"{'mode':<14} {'page':>6} {'queries':>8} {'ms/page':>9}")
+            for mode, query in params.items():
+                for number in (1, page):
+                    request = Request(factory.get("/", query(number)))
+
+                    def paginate():
+                        rows = KeysetPagination().paginate_queryset(orders, request, view)
+                        assert len(rows) == size
+
+                    seconds, queries = measure(paginate, options["repeat"])
+                    self.stdout.write(f"{mode:<14} {number:>6} {queries:>8.0f} {seconds * 1000:>9.2f}")
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from distributor.models import Product, ProductCategory
+from distributor.search import SQLiteFTSBackend
+
+from ._benchmark import make_user, measure, rolled_back
+
+COMMON_WORDS = 100
+RARE_WORDS = 10000
+
+
+def ranked_per_row(queryset, query):
+    """The search before the rank was joined, one MATCH subquery per matching product."""
+    match, fts = SQLiteFTSBackend.match_expression(query), SQLiteFTSBackend.table
+    table = queryset.model._meta.db_table
+    return queryset.filter(
+        pk__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [match])
+    ).annotate(
+        search_rank=RawSQL(
+            f'SELECT rank FROM {fts} WHERE {fts} MATCH %s AND rowid = "{table}"."id"', [match]
+        )
+    ).order_by("search_rank", "-id")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the first page of a product search ranked with a MATCH subquery per row against "
+        "one joined MATCH, over a large catalogue of throwaway products that are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1000000)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The FTS5 search index only exists on SQLite.")
+        backend = SQLiteFTSBackend()
+        size = options["page_size"]
+
+        with rolled_back():
+            distributor = make_user()
+            category = ProductCategory.objects.create(name=f"Benchmark {distributor.username}")
+            for start in range(0, options["products"], 10000):
+                Product.objects.bulk_create(
+                    Product(
+                        name=f"common{n % COMMON_WORDS:03d} rare{n % RARE_WORDS:05d}", price=10, stock=1,
+                        category=category, distributor=distributor,
+                    )
+                    for n in range(start, min(start + 10000, options["products"]))
+                )
+            backend.rebuild()
+            products = Product.objects.filter(distributor=distributor)
+
+            self.stdout.write(f"{'query':<10} {'matches':>8} {'path':<16} {'ms/page':>9}")
+            for query in ("rare00007", "common007"):
+                matches = backend.search(products, query).count()
+                for name, search in (("rank per row", ranked_per_row), ("joined rank", backend.search)):
+                    seconds, _ = measure(lambda: list(search(products, query)[:size]), options["repeat"])
+                    self.stdout.write(f"{query:<10} {matches:>8} {name:<16} {seconds * 1000:>9.1f}")
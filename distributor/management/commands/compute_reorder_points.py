@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from distributor.forecasting import compute_reorder_points
+
+
+class Command(BaseCommand):
+    help = "Recompute demand, safety stock and reorder points for the whole catalog from the sales ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--history-days", type=int, help="Days of sales history, REORDER_HISTORY_DAYS by default")
+        parser.add_argument("--lead-time", type=int, help="Supplier lead time in days, REORDER_LEAD_TIME_DAYS by default")
+        parser.add_argument("--review-days", type=int, help="Days between orders, REORDER_REVIEW_DAYS by default")
+        parser.add_argument("--service-factor", type=float, help="Safety stock in standard deviations of demand")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        computed = compute_reorder_points(
+            history_days=options["history_days"], lead_time=options["lead_time"],
+            review=options["review_days"], service_factor=options["service_factor"],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Computed {computed} reorder suggestions in {elapsed:.2f}s."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from distributor.catalog import FORMATS, ImportAborted, guess_format, import_products, read_rows
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Upsert a distributor's products from a CSV or NDJSON file keyed on sku."
+
+    def add_arguments(self, parser):
+        parser.add_argument("distributor", help="Email of the distributor")
+        parser.add_argument("path")
+        parser.add_argument("--file-format", choices=FORMATS)
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            distributor = User.objects.get(email=options["distributor"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['distributor']}")
+
+        fmt = options["file_format"] or guess_format(options["path"])
+        try:
+            with open(options["path"], "rb") as stream:
+                report = import_products(distributor, read_rows(stream, fmt), chunk_size=options["chunk_size"])
+        except ImportAborted as exc:
+            self.report(exc.report)
+            raise CommandError(str(exc))
+        self.report(report)
+
+    def report(self, report):
+        for error in report["errors"]:
+            self.stdout.write(self.style.WARNING(f"Row {error['row']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']}, updated {report['updated']}, {len(report['errors'])} errors."
+        ))
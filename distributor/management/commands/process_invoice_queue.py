@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from distributor.invoicing import process_invoice_queue
+
+
+class Command(BaseCommand):
+    help = "Create the invoices queued for paid orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the queue")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_invoice_queue(batch_size=options["batch_size"])
+            if processed:
+                self.stdout.write(f"Processed {processed} invoice jobs.")
+            if not options["loop"]:
+                break
+            if not processed:
+                time.sleep(options["interval"])
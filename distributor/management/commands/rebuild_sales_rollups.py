@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from distributor.rollups import rebuild
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily, weekly and monthly sales buckets from paid orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--distributor", help="Email of a single distributor to rebuild")
+
+    def handle(self, *args, **options):
+        distributor = None
+        if options["distributor"]:
+            distributor = User.objects.get(email=options["distributor"])
+        created = rebuild(distributor)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {created} sales buckets."))
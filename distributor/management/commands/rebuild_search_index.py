@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from distributor.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search index from the product table."
+
+    def handle(self, *args, **options):
+        indexed = get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} products."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from distributor.cache import invalidate
+from distributor.models import Order
+
+
+class Command(BaseCommand):
+    help = "Backfill or repair the stored order totals from the order items."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--order", type=int, nargs="*", help="Only recompute these order ids")
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all()
+        if options["order"]:
+            orders = orders.filter(pk__in=options["order"])
+        updated = orders.recompute_totals()
+        invalidate("order")
+        self.stdout.write(self.style.SUCCESS(f"Recomputed totals for {updated} orders."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from distributor.ledger import reconcile
+
+
+class Command(BaseCommand):
+    help = "Compare Product.stock with the stock ledger and optionally append correcting adjustments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Append adjustments so the ledger matches Product.stock")
+
+    def handle(self, *args, **options):
+        drifted = reconcile(fix=options["fix"])
+        for pk, stock, balance in drifted:
+            self.stdout.write(f"Product {pk}: stock {stock}, ledger {balance}")
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Stock matches the ledger."))
+        elif options["fix"]:
+            self.stdout.write(self.style.SUCCESS(f"Adjusted {len(drifted)} products."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} products differ from the ledger."))
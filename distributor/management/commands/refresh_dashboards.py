@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from distributor.dashboard import refresh_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard counters of every distributor, run it on a schedule."
+
+    def handle(self, *args, **options):
+        refreshed = refresh_summaries()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} dashboards."))
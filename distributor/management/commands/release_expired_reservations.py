@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from distributor.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired cart stock reservations."
+
+    def handle(self, *args, **options):
+        released = release_expired()
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservations."))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from distributor.cache import cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit and miss counts of the API response cache."
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        self.stdout.write(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {stats['hit_rate']:.1%}")
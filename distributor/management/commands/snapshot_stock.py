@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from distributor.ledger import take_snapshots
+
+
+class Command(BaseCommand):
+    help = "Snapshot the ledger balance of every product that moved since its last snapshot."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        created = take_snapshots(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {created} stock snapshots."))
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:30
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model('distributor', 'Order')
+    OrderItem = apps.get_model('distributor', 'OrderItem')
+    items = OrderItem.objects.filter(order=OuterRef('pk')).values('order')
+    amount = items.annotate(
+        total=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    ).values('total')
+    count = items.annotate(count=Count('id')).values('count')
+    Order.objects.update(
+        total_amount=Coalesce(Subquery(amount), Value(Decimal('0.00')), output_field=DecimalField(max_digits=12, decimal_places=2)),
+        item_count=Coalesce(Subquery(count), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0005_salesrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of order items'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of price x quantity over the order items', max_digits=12),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
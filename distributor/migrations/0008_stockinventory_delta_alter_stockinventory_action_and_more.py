@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+
+
+def backfill_deltas(apps, schema_editor):
+    StockInventory = apps.get_model('distributor', 'StockInventory')
+    StockInventory.objects.update(
+        delta=Case(
+            When(action='restock', then=F('quantity')),
+            default=Value(0) - F('quantity'),
+            output_field=models.IntegerField(),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0007_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockinventory',
+            name='delta',
+            field=models.IntegerField(default=0, help_text='Signed change applied to the product stock'),
+        ),
+        migrations.AlterField(
+            model_name='stockinventory',
+            name='action',
+            field=models.CharField(choices=[('restock', 'Restock'), ('sale', 'Sale'), ('return', 'Return'), ('adjustment', 'Adjustment'), ('cancellation', 'Order Cancellation')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.IntegerField()),
+                ('last_movement_id', models.BigIntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='distributor.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'taken_at'], name='distributor_product_d794d8_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_deltas, migrations.RunPython.noop),
+    ]
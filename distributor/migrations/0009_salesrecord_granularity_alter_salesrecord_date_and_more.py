@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0008_stockinventory_delta_alter_stockinventory_action_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesrecord',
+            name='granularity',
+            field=models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], default='day', max_length=5),
+        ),
+        migrations.AlterField(
+            model_name='salesrecord',
+            name='date',
+            field=models.DateField(help_text='First day of the bucket'),
+        ),
+        migrations.AlterField(
+            model_name='salesrecord',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='salesrecord',
+            name='total_sales',
+            field=models.DecimalField(decimal_places=2, default=0.0, help_text='Number of paid orders', max_digits=10),
+        ),
+        migrations.AddConstraint(
+            model_name='salesrecord',
+            constraint=models.UniqueConstraint(fields=('distributor', 'granularity', 'date'), name='unique_sales_bucket'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS distributor_product_fts "
+        "USING fts5(name, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO distributor_product_fts (rowid, name, description) "
+        "SELECT id, name, COALESCE(description, '') FROM distributor_product"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS distributor_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0009_salesrecord_granularity_alter_salesrecord_date_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0010_product_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['distributor', 'created_at', 'id'], name='distributor_distrib_2a71d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockinventory',
+            index=models.Index(fields=['timestamp', 'id'], name='distributor_timesta_a6d9bb_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0011_order_distributor_distrib_2a71d9_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_method', models.CharField(choices=[('card', 'Credit/Debit Card'), ('bank_transfer', 'Bank Transfer'), ('paystack', 'Paystack'), ('paypal', 'PayPal')], default='card', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_job', to='distributor.order')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0013_product_sku_product_unique_distributor_sku'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'product'], name='distributor_cart_id_760118_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['distributor', 'status', 'created_at'], name='distributor_distrib_c195d2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['distributor', 'category'], name='distributor_distrib_49615d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockinventory',
+            index=models.Index(fields=['product', '-timestamp', '-id'], name='distributor_product_f1fc84_idx'),
+        ),
+    ]
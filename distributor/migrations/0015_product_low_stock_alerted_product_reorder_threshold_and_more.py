@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0014_cartitem_distributor_cart_id_760118_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='low_stock_alerted',
+            field=models.BooleanField(default=False, help_text='Set once the distributor was alerted, cleared when stock recovers'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_threshold',
+            field=models.PositiveIntegerField(blank=True, help_text="Alert when stock falls to this level, the category's threshold applies when empty", null=True),
+        ),
+        migrations.AddField(
+            model_name='productcategory',
+            name='reorder_threshold',
+            field=models.PositiveIntegerField(blank=True, help_text="Default low stock level for the category's products", null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0015_product_low_stock_alerted_product_reorder_threshold_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders_by_status', models.JSONField(default=dict)),
+                ('low_stock_products', models.PositiveIntegerField(default=0)),
+                ('unpaid_invoices', models.PositiveIntegerField(default=0)),
+                ('unpaid_invoice_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('unread_notifications', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField()),
+                ('distributor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0016_dashboardsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('average_daily_demand', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('recent_daily_demand', models.DecimalField(decimal_places=2, help_text='Average over the last week', max_digits=12)),
+                ('demand_deviation', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('safety_stock', models.PositiveIntegerField()),
+                ('reorder_point', models.PositiveIntegerField()),
+                ('suggested_quantity', models.PositiveIntegerField(help_text='Units to order now to cover the lead time and review period')),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_suggestion', to='distributor.product')),
+            ],
+        ),
+    ]
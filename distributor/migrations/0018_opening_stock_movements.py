@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import F, IntegerField, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def record_opening_stock(apps, schema_editor):
+    """Append an opening adjustment so the ledger of every existing product sums to its stock."""
+    Product = apps.get_model('distributor', 'Product')
+    StockInventory = apps.get_model('distributor', 'StockInventory')
+    products = Product.objects.annotate(
+        ledger=Coalesce(Sum('stock_movements__delta'), Value(0), output_field=IntegerField())
+    ).exclude(stock=F('ledger')).values_list('pk', 'stock', 'ledger')
+
+    batch = []
+    for pk, stock, ledger in products.iterator(chunk_size=2000):
+        delta = stock - ledger
+        batch.append(StockInventory(
+            product_id=pk, action='adjustment', quantity=abs(delta), delta=delta, description="Opening stock"
+        ))
+        if len(batch) >= 2000:
+            StockInventory.objects.bulk_create(batch)
+            batch = []
+    StockInventory.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0017_reordersuggestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(record_opening_stock, migrations.RunPython.noop),
+    ]
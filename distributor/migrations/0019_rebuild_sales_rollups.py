@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+TRUNCATE = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def rebuild_rollups(apps, schema_editor):
+    """Fill the day, week and month buckets from the orders paid before the rollups existed."""
+    Order = apps.get_model('distributor', 'Order')
+    SalesRecord = apps.get_model('distributor', 'SalesRecord')
+    orders = Order.objects.filter(payment_status='paid').exclude(status='cancelled')
+
+    SalesRecord.objects.all().delete()
+    for granularity, trunc in TRUNCATE.items():
+        rows = (
+            orders.annotate(period=trunc('created_at'))
+            .values('distributor_id', 'period')
+            .annotate(count=Count('id'), revenue=Sum('total_amount'))
+        )
+        SalesRecord.objects.bulk_create(
+            SalesRecord(
+                distributor_id=row['distributor_id'], granularity=granularity,
+                date=row['period'].date(), total_sales=row['count'], revenue=row['revenue'],
+            )
+            for row in rows.iterator()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0018_opening_stock_movements'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
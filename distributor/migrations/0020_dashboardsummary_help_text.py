@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distributor', '0019_rebuild_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dashboardsummary',
+            name='unpaid_invoice_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Total of the unpaid orders', max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='dashboardsummary',
+            name='unpaid_invoices',
+            field=models.PositiveIntegerField(default=0, help_text='Unpaid orders that are not cancelled'),
+        ),
+    ]
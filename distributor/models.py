@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from decimal import Decimal
 from django.conf import settings
 from django.utils.crypto import get_random_string
 from django.utils import timezone
@@ -11,6 +14,7 @@ User = get_user_model()
 class ProductCategory(models.Model):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True, null=True)
+    reorder_threshold = models.PositiveIntegerField(blank=True, null=True, help_text="Default low stock level for the category's products")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -18,16 +22,25 @@ class ProductCategory(models.Model):
         return self.name
 
 class Product(models.Model):
+    sku = models.CharField(max_length=64, blank=True, null=True, help_text="Distributor's own product code")
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     discount = models.DecimalField(max_digits=5, decimal_places=2, default=0.00, help_text="Discount in percentage")
     stock = models.PositiveIntegerField()
+    reorder_threshold = models.PositiveIntegerField(blank=True, null=True, help_text="Alert when stock falls to this level, the category's threshold applies when empty")
+    low_stock_alerted = models.BooleanField(default=False, help_text="Set once the distributor was alerted, cleared when stock recovers")
     category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE, related_name="products")
     distributor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="products")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['distributor', 'sku'], name='unique_distributor_sku'),
+        ]
+        indexes = [models.Index(fields=['distributor', 'category'])]
+
     def discounted_price(self):
         """Calculate the price after discount."""
         return self.price * (1 - self.discount / 100)
@@ -35,6 +48,21 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+class OrderQuerySet(models.QuerySet):
+    def recompute_totals(self):
+        """Rebuild the stored totals of these orders from their items in a single UPDATE."""
+        items = OrderItem.objects.filter(order=OuterRef('pk')).values('order')
+        amount = items.annotate(
+            total=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+        ).values('total')
+        count = items.annotate(count=Count('id')).values('count')
+        return self.update(
+            total_amount=Coalesce(Subquery(amount), Value(Decimal('0.00')), output_field=DecimalField(max_digits=12, decimal_places=2)),
+            item_count=Coalesce(Subquery(count), Value(0)),
+            updated_at=timezone.now(),
+        )
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -56,24 +84,39 @@ class Order(models.Model):
     payment_status = models.CharField(max_length=10, choices=PAYMENT_STATUS_CHOICES, default='unpaid')
     tracking_number = models.CharField(max_length=20, unique=True, blank=True, null=True)
     estimated_delivery = models.DateField(blank=True, null=True)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Sum of price x quantity over the order items")
+    item_count = models.PositiveIntegerField(default=0, help_text="Number of order items")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so status transitions can be detected after saving.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['distributor', 'created_at', 'id']),
+            models.Index(fields=['distributor', 'status', 'created_at']),
+        ]
+
+    # Maintained by the OrderItem signals, never written back from a possibly stale instance.
+    DERIVED_FIELDS = ('total_amount', 'item_count')
+
     def save(self, *args, **kwargs):
         if not self.tracking_number:
             self.tracking_number = get_random_string(12).upper()
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DERIVED_FIELDS
+            ]
         super().save(*args, **kwargs)
 
-        # Generate an invoice automatically when the order is marked as paid
-        if self.payment_status == "paid" and not hasattr(self, "invoice"):
-            Invoice.objects.create(
-                order=self,
-                invoice_number=f"INV-{self.id}-{timezone.now().strftime('%Y%m%d')}",
-                issue_date=timezone.now(),
-                due_date=timezone.now() + timedelta(days=30),
-                payment_status="paid",
-            )
-
     def __str__(self):
         return f"Order {self.id} - {self.customer_name}"
 
@@ -83,13 +126,37 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so the order totals can be adjusted by the difference.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def line_total(self):
+        return Decimal(self.price) * self.quantity
+
     def save(self, *args, **kwargs):
-        if self.product.stock >= self.quantity:
-            self.product.stock -= self.quantity
-            self.product.save()
-        else:
-            raise ValueError("Not enough stock available")
-        super().save(*args, **kwargs)
+        """Take the quantity off the product's stock when the item is first created."""
+        from .reservations import held_subquery
+
+        updated = 0
+        with transaction.atomic():
+            if self._state.adding:
+                # Units held by carts are not for sale, the same guard checkout applies.
+                updated = Product.objects.filter(
+                    pk=self.product_id, stock__gte=held_subquery() + self.quantity
+                ).update(
+                    stock=F('stock') - self.quantity, updated_at=timezone.now()
+                )
+                if not updated:
+                    raise ValueError("Not enough stock available")
+            super().save(*args, **kwargs)
+            if updated:
+                StockInventory.objects.create(
+                    product_id=self.product_id, action='sale', quantity=self.quantity,
+                    delta=-self.quantity, description=f"Order {self.order_id}",
+                )
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name} in Order {self.order.id}"
@@ -115,13 +182,22 @@ class Invoice(models.Model):
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default='card')
 
     def save(self, *args, **kwargs):
-        """Calculate the total amount from order items before saving."""
-        self.total_amount = sum(item.price * item.quantity for item in self.order.items.all())
+        """Copy the stored order total before saving."""
+        self.total_amount = self.order.total_amount
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Invoice {self.invoice_number} for Order {self.order.id}"
 
+class InvoiceJob(models.Model):
+    """Queued request to invoice a paid order, processed in batches off the request path."""
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="invoice_job")
+    payment_method = models.CharField(max_length=20, choices=Invoice.PAYMENT_METHODS, default='card')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Invoice job for Order {self.order_id}"
+
 class Cart(models.Model):
     customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="carts")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -135,33 +211,117 @@ class CartItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['cart', 'product'])]
+
     def __str__(self):
         return f"{self.quantity} x {self.product.name} in Cart {self.cart.id}"
     
+class StockReservation(models.Model):
+    """Time-limited hold on product stock for an item sitting in a cart."""
+    cart_item = models.OneToOneField(CartItem, on_delete=models.CASCADE, related_name="reservation")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservations")
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['product', 'expires_at'])]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held until {self.expires_at}"
+
 class StockInventory(models.Model):
+    """Append-only ledger of stock movements, Product.stock is the running sum of delta."""
     STOCK_ACTIONS = [
         ('restock', 'Restock'),
         ('sale', 'Sale'),
         ('return', 'Return'),
         ('adjustment', 'Adjustment'),
+        ('cancellation', 'Order Cancellation'),
     ]
     
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_movements")
     action = models.CharField(max_length=20, choices=STOCK_ACTIONS)
     quantity = models.PositiveIntegerField()
+    delta = models.IntegerField(default=0, help_text="Signed change applied to the product stock")
     timestamp = models.DateTimeField(auto_now_add=True)
     description = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['product', '-timestamp', '-id']),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Stock movements are append-only, record a new movement instead.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Stock movements are append-only, record a new movement instead.")
+
     def __str__(self):
         return f"{self.action.capitalize()} - {self.quantity} {self.product.name}"
+
+class StockSnapshot(models.Model):
+    """Product balance covering every movement up to last_movement_id."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_snapshots")
+    balance = models.IntegerField()
+    last_movement_id = models.BigIntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['product', 'taken_at'])]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.balance} at {self.taken_at}"
     
 class SalesRecord(models.Model):
+    """Paid sales of a distributor rolled up into a daily, weekly or monthly bucket."""
+    GRANULARITY_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
     distributor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sales")
-    total_sales = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    date = models.DateField(auto_now_add=True)
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES, default='day')
+    total_sales = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, help_text="Number of paid orders")
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    date = models.DateField(help_text="First day of the bucket")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['distributor', 'granularity', 'date'], name='unique_sales_bucket'),
+        ]
 
     def __str__(self):
         return f"Sales for {self.distributor.username} on {self.date}"
 
+class DashboardSummary(models.Model):
+    """Precomputed home screen counters of a distributor, refreshed by dashboard.refresh_summaries."""
+    distributor = models.OneToOneField(User, on_delete=models.CASCADE, related_name="dashboard_summary")
+    orders_by_status = models.JSONField(default=dict)
+    low_stock_products = models.PositiveIntegerField(default=0)
+    unpaid_invoices = models.PositiveIntegerField(default=0, help_text="Unpaid orders that are not cancelled")
+    unpaid_invoice_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Total of the unpaid orders")
+    unread_notifications = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField()
 
+    def __str__(self):
+        return f"Dashboard of {self.distributor_id} at {self.refreshed_at}"
+
+class ReorderSuggestion(models.Model):
+    """Demand statistics and suggested restock of a product, written by forecasting.compute_reorder_points."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="reorder_suggestion")
+    average_daily_demand = models.DecimalField(max_digits=12, decimal_places=2)
+    recent_daily_demand = models.DecimalField(max_digits=12, decimal_places=2, help_text="Average over the last week")
+    demand_deviation = models.DecimalField(max_digits=12, decimal_places=2)
+    safety_stock = models.PositiveIntegerField()
+    reorder_point = models.PositiveIntegerField()
+    suggested_quantity = models.PositiveIntegerField(help_text="Units to order now to cover the lead time and review period")
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Reorder {self.suggested_quantity} of {self.product_id}"
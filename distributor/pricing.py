@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+from .models import Cart, CartItem, Product
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def money(expression):
+    return ExpressionWrapper(expression, output_field=MONEY)
+
+
+def discounted_price(prefix=''):
+    """Unit price after discount rounded to cents, the database side of Product.discounted_price."""
+    # Multiplying by 0.01 instead of dividing by 100 keeps SQLite from doing integer division.
+    price, discount = F(f'{prefix}price'), F(f'{prefix}discount')
+    return Round(money(price * (Value(100) - discount) * Value(Decimal('0.01'))), 2, output_field=MONEY)
+
+
+def priced_products(queryset=None):
+    """Products annotated with unit_price, the price an order line is charged at."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.annotate(unit_price=discounted_price())
+
+
+def priced_cart_items(queryset=None):
+    """Cart items annotated with their list price, discount, unit price and line totals."""
+    queryset = CartItem.objects.all() if queryset is None else queryset
+    unit_price = discounted_price('product__')
+    return queryset.annotate(
+        list_price=F('product__price'),
+        discount=F('product__discount'),
+        unit_price=unit_price,
+        line_subtotal=money(F('product__price') * F('quantity')),
+        line_total=money(unit_price * F('quantity')),
+    )
+
+
+def priced_carts(queryset=None):
+    """Carts annotated with subtotal, discount_total and total, summed over their items."""
+    queryset = Cart.objects.all() if queryset is None else queryset
+    subtotal = Coalesce(Sum(money(F('items__product__price') * F('items__quantity'))), Value(Decimal('0')), output_field=MONEY)
+    total = Coalesce(Sum(money(discounted_price('items__product__') * F('items__quantity'))), Value(Decimal('0')), output_field=MONEY)
+    return queryset.annotate(subtotal=subtotal, total=total).annotate(discount_total=money(F('subtotal') - F('total')))
+
+
+def quote_baskets(baskets):
+    """Price lists of {product: id, quantity: n} lines with one query for all of their products."""
+    product_ids = {line['product'] for basket in baskets for line in basket}
+    products = priced_products(Product.objects.only('id', 'name', 'price', 'discount')).in_bulk(product_ids)
+
+    quotes = []
+    for basket in baskets:
+        lines, unknown = [], []
+        for line in basket:
+            product = products.get(line['product'])
+            if product is None:
+                unknown.append(line['product'])
+                continue
+            lines.append({
+                'product': product.pk,
+                'product_name': product.name,
+                'quantity': line['quantity'],
+                'list_price': product.price,
+                'discount': product.discount,
+                'unit_price': product.unit_price,
+                'line_subtotal': product.price * line['quantity'],
+                'line_total': product.unit_price * line['quantity'],
+            })
+        subtotal = sum((line['line_subtotal'] for line in lines), Decimal('0'))
+        total = sum((line['line_total'] for line in lines), Decimal('0'))
+        quotes.append({
+            'items': lines,
+            'unknown_products': unknown,
+            'subtotal': subtotal,
+            'discount_total': subtotal - total,
+            'total': total,
+        })
+    return quotes
@@ -0,0 +1,83 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Product, StockReservation
+
+# How long an item added to a cart holds its stock.
+RESERVATION_TTL = timedelta(minutes=getattr(settings, "CART_RESERVATION_MINUTES", 15))
+
+
+def live_holds(exclude_cart=None, exclude_item=None):
+    """Reservations that have not expired yet, optionally leaving one cart or cart item out."""
+    holds = StockReservation.objects.filter(expires_at__gt=timezone.now())
+    if exclude_cart is not None:
+        holds = holds.exclude(cart_item__cart=exclude_cart)
+    if exclude_item is not None:
+        holds = holds.exclude(cart_item=exclude_item)
+    return holds
+
+
+def held_quantities(product_ids, exclude_cart=None, exclude_item=None):
+    """Map product id -> units currently held by carts."""
+    rows = (
+        live_holds(exclude_cart, exclude_item)
+        .filter(product_id__in=product_ids)
+        .values("product_id")
+        .annotate(held=Sum("quantity"))
+    )
+    return {row["product_id"]: row["held"] for row in rows}
+
+
+def held_subquery(exclude_cart=None):
+    """Units held on the outer Product row, usable inside filters and updates."""
+    held = (
+        live_holds(exclude_cart)
+        .filter(product=OuterRef("pk"))
+        .values("product")
+        .annotate(held=Sum("quantity"))
+        .values("held")
+    )
+    return Coalesce(Subquery(held), Value(0), output_field=IntegerField())
+
+
+def available_stock(product, exclude_cart=None, exclude_item=None):
+    """Stock minus the live holds of other carts."""
+    held = held_quantities([product.pk], exclude_cart, exclude_item).get(product.pk, 0)
+    return product.stock - held
+
+
+def reserve(cart_item):
+    """
+    Hold stock for a cart item and return whether the hold fits.
+
+    The hold is written first and checked afterwards instead of locking the product row,
+    so concurrent carts on the same product only insert rows. Every writer checks after
+    its own hold is visible, which means the total held can never exceed the stock; a
+    writer that does not fit removes its own hold again. Call it outside of an atomic
+    block so the hold is committed before the check runs.
+    """
+    StockReservation.objects.update_or_create(
+        cart_item=cart_item,
+        defaults={
+            "product_id": cart_item.product_id,
+            "quantity": cart_item.quantity,
+            "expires_at": timezone.now() + RESERVATION_TTL,
+        },
+    )
+    held = held_quantities([cart_item.product_id]).get(cart_item.product_id, 0)
+    stock = Product.objects.values_list("stock", flat=True).get(pk=cart_item.product_id)
+    if held > stock:
+        StockReservation.objects.filter(cart_item=cart_item).delete()
+        return False
+    return True
+
+
+def release_cart(cart):
+    return StockReservation.objects.filter(cart_item__cart=cart).delete()[0]
+
+
+def release_expired():
+    """Drop every expired hold in one DELETE."""
+    return StockReservation.objects.filter(expires_at__lte=timezone.now()).delete()[0]
@@ -0,0 +1,98 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from .models import Order, SalesRecord
+
+TRUNCATE = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def period_start(day, granularity):
+    """First day of the bucket that contains day."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def add_to_buckets(changes):
+    """
+    Apply (order, count, revenue) changes to the sales buckets of each order's day.
+
+    Changes are grouped per bucket first, so each touched bucket costs one UPDATE
+    however many orders fall into it.
+    """
+    buckets = defaultdict(lambda: [0, Decimal('0.00')])
+    for order, count, revenue in changes:
+        day = timezone.localdate(order.created_at)
+        for granularity in TRUNCATE:
+            bucket = buckets[(order.distributor_id, granularity, period_start(day, granularity))]
+            bucket[0] += count
+            bucket[1] += revenue
+
+    for (distributor_id, granularity, date), (count, revenue) in buckets.items():
+        bucket = SalesRecord.objects.filter(distributor_id=distributor_id, granularity=granularity, date=date)
+        changes = {'total_sales': F('total_sales') + count, 'revenue': F('revenue') + revenue}
+        if bucket.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                SalesRecord.objects.create(
+                    distributor_id=distributor_id, granularity=granularity, date=date,
+                    total_sales=count, revenue=revenue,
+                )
+        except IntegrityError:
+            # Another writer created the bucket first.
+            bucket.update(**changes)
+
+
+def record_sales(orders, sign=1):
+    """Add paid orders to (sign=1) or take cancelled ones off (sign=-1) the sales buckets."""
+    add_to_buckets((order, sign, sign * order.total_amount) for order in orders)
+
+
+def record_revenue(order_id, amount):
+    """Move the revenue of a paid order whose total changed by amount, unpaid orders are not in the buckets."""
+    if not amount:
+        return
+    sale = (
+        Order.objects.filter(pk=order_id, payment_status='paid').exclude(status='cancelled')
+        .only('distributor_id', 'created_at').first()
+    )
+    if sale is not None:
+        add_to_buckets([(sale, 0, amount)])
+
+
+def rebuild(distributor=None):
+    """Recompute every bucket from the paid orders, grouped in the database."""
+    orders = Order.objects.filter(payment_status='paid').exclude(status='cancelled')
+    records = SalesRecord.objects.all()
+    if distributor is not None:
+        orders = orders.filter(distributor=distributor)
+        records = records.filter(distributor=distributor)
+
+    with transaction.atomic():
+        records.delete()
+        created = 0
+        for granularity, trunc in TRUNCATE.items():
+            rows = (
+                orders.annotate(period=trunc('created_at'))
+                .values('distributor_id', 'period')
+                .annotate(count=Count('id'), revenue=Sum('total_amount'))
+            )
+            created += len(SalesRecord.objects.bulk_create(
+                SalesRecord(
+                    distributor_id=row['distributor_id'], granularity=granularity,
+                    date=row['period'].date(), total_sales=row['count'], revenue=row['revenue'],
+                )
+                for row in rows.iterator()
+            ))
+    return created
@@ -0,0 +1,104 @@
+import re
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+_backend = None
+
+
+class DatabaseSearchBackend:
+    """Plain icontains matching, for databases without a full-text index."""
+
+    def index(self, products):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, queryset, query):
+        terms = query.split()
+        for term in terms:
+            queryset = queryset.filter(name__icontains=term) | queryset.filter(description__icontains=term)
+        return queryset
+
+
+class SQLiteFTSBackend:
+    """Products indexed in an FTS5 table whose rowid is the product id, ranked with bm25."""
+    table = "distributor_product_fts"
+
+    def index(self, products):
+        rows = [(product.pk, product.name, product.description or "") for product in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (rowid, name, description) VALUES (%s, %s, %s)", rows
+            )
+
+    def remove(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(pk,) for pk in product_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, name, description) "
+                "SELECT id, name, COALESCE(description, '') FROM distributor_product"
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def match_expression(query):
+        """Quote every word and prefix match it, so user input never reaches the FTS5 query syntax."""
+        words = re.findall(r"\w+", query)
+        return " ".join(f'"{word}"*' for word in words)
+
+    def search(self, queryset, query):
+        """
+        Join the matching index rows once and order by their rank. A rank subquery per
+        product would run the MATCH again for every row of the result.
+        """
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        return queryset.extra(
+            tables=[self.table],
+            # The unary + keeps SQLite from probing the index once per product row, the
+            # index is always scanned first even when the product filters use an index.
+            where=[f'"{table}"."id" = +{self.table}.rowid', f"{self.table} MATCH %s"],
+            params=[match],
+            select={"search_rank": f"{self.table}.rank"},
+        ).order_by("search_rank", "-id")
+
+
+def get_backend():
+    """The configured PRODUCT_SEARCH_BACKEND, or FTS5 on SQLite and icontains elsewhere."""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, "PRODUCT_SEARCH_BACKEND", None)
+        if path:
+            _backend = import_string(path)()
+        elif connection.vendor == "sqlite":
+            _backend = SQLiteFTSBackend()
+        else:
+            _backend = DatabaseSearchBackend()
+    return _backend
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """SearchFilter that asks the search backend instead of running LIKE '%term%' scans."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+        return get_backend().search(queryset, query)
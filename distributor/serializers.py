@@ -1,124 +1,319 @@
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+from django.utils import timezone
 from rest_framework import serializers
-from .models import ProductCategory, Product, Order, OrderItem, Invoice, Cart, CartItem, StockInventory,SalesRecord
+from .models import ProductCategory, Product, Order, OrderItem, Invoice, Cart, CartItem, StockInventory,SalesRecord, ReorderSuggestion
+from .fieldsets import SparseFieldsMixin
+from .fulfilment import can_transition, restock_orders
+from .ledger import InsufficientStock, apply_delta, apply_movement, movement, record_movements
+from .pricing import priced_products
+from .reservations import available_stock, held_quantities, held_subquery
 
 
-class SalesRecordSerializer(serializers.ModelSerializer):
+class SalesRecordSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = SalesRecord
         fields = "__all__"
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.ReadOnlyField(source='product.name')
+    # Annotated by pricing.priced_cart_items, left out of responses for unannotated items.
+    list_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    discount = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+    unit_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    line_subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = CartItem
-        fields = ['id', 'cart', 'product', 'product_name', 'quantity', 'added_at']
+        fields = [
+            'id', 'cart', 'product', 'product_name', 'quantity', 'added_at',
+            'list_price', 'discount', 'unit_price', 'line_subtotal', 'line_total'
+        ]
+        expandable_fields = {'product': 'ProductSerializer'}
 
     def validate(self, data):
-        """Ensure cart items do not exceed available stock."""
-        product = data.get('product')
-        if product.stock < data.get('quantity'):
-            raise serializers.ValidationError(f"Only {product.stock} units available.")
+        """Ensure cart items do not exceed the stock left after other carts' holds."""
+        product = data.get('product', getattr(self.instance, 'product', None))
+        quantity = data.get('quantity', getattr(self.instance, 'quantity', 1))
+        available = available_stock(product, exclude_item=self.instance)
+        if available < quantity:
+            raise serializers.ValidationError(f"Only {max(available, 0)} units available.")
         return data
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
+    # Annotated by pricing.priced_carts.
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    discount_total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = Cart
-        fields = ['id', 'customer', 'items', 'created_at']
+        fields = ['id', 'customer', 'items', 'subtotal', 'discount_total', 'total', 'created_at']
 
 
-class ProductCategorySerializer(serializers.ModelSerializer):
+class ProductCategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductCategory
-        fields = ['id', 'name', 'description', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'reorder_threshold', 'created_at', 'updated_at']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     discounted_price = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'description', 'price', 'discount',
-            'discounted_price', 'stock', 'category', 'distributor',
+            'id', 'sku', 'name', 'description', 'price', 'discount',
+            'discounted_price', 'stock', 'reorder_threshold', 'category', 'distributor',
             'created_at', 'updated_at'
         ]
+        expandable_fields = {'category': ProductCategorySerializer}
+        field_sources = {'discounted_price': ('price', 'discount')}
+        # The generated unique together validator would make sku required, see validate_sku.
+        validators = []
 
     def get_discounted_price(self, obj):
         """Calculate the final price after discount."""
         return obj.price * (1 - obj.discount / 100)
 
+    def validate_sku(self, value):
+        """A sku is optional but unique within the distributor's catalog."""
+        if not value:
+            return None
+        distributor = self.instance.distributor_id if self.instance else self.context['request'].user.pk
+        clashes = Product.objects.filter(distributor_id=distributor, sku=value)
+        if self.instance is not None:
+            clashes = clashes.exclude(pk=self.instance.pk)
+        if clashes.exists():
+            raise serializers.ValidationError("You already have a product with this sku.")
+        return value
+
+    def create(self, validated_data):
+        """Open the product's ledger with its starting stock."""
+        product = super().create(validated_data)
+        record_movements([movement(product.pk, 'restock', product.stock, "Opening stock")])
+        return product
+
+    def update(self, instance, validated_data):
+        """
+        Save the edited fields but never the loaded stock, a stock edit is applied as a ledger
+        adjustment on top of the sales made since the product was read.
+        """
+        delta = validated_data.pop('stock', instance.stock) - instance.stock
+        with transaction.atomic():
+            for name, value in validated_data.items():
+                setattr(instance, name, value)
+            instance.save(update_fields=[*validated_data, 'updated_at'])
+            if delta:
+                try:
+                    apply_delta(instance, 'adjustment', delta, "Stock edited")
+                except InsufficientStock as exc:
+                    raise serializers.ValidationError({'stock': str(exc)})
+        instance.refresh_from_db(fields=['stock'])
+        return instance
+
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.ReadOnlyField(source='product.name')
 
     class Meta:
         model = OrderItem
         fields = ['id', 'order', 'product', 'product_name', 'quantity', 'price']
+        expandable_fields = {'product': ProductSerializer}
 
     def validate(self, data):
         """Ensure there is enough stock before adding order items."""
         product = data.get('product')
-        if product.stock < data.get('quantity'):
-            raise serializers.ValidationError(f"Only {product.stock} units available.")
+        available = available_stock(product)
+        if available < data.get('quantity'):
+            raise serializers.ValidationError(f"Only {max(available, 0)} units available.")
         return data
 
     def create(self, validated_data):
-        """Deduct stock when an order item is created."""
-        product = validated_data['product']
-        product.stock -= validated_data['quantity']
-        product.save()
-        return super().create(validated_data)
+        """Stock is deducted by OrderItem.save, surface a race on the last units as a validation error."""
+        try:
+            return super().create(validated_data)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     customer_email = serializers.ReadOnlyField()
-    total_amount = serializers.SerializerMethodField()
+    total_amount = serializers.ReadOnlyField()
+    item_count = serializers.ReadOnlyField()
 
     class Meta:
         model = Order
         fields = [
             'id', 'distributor', 'customer_name', 'customer_email', 'status',
-            'tracking_number', 'estimated_delivery', 'created_at', 'updated_at',
-            'items', 'total_amount'
+            'payment_status', 'tracking_number', 'estimated_delivery', 'created_at', 'updated_at',
+            'items', 'total_amount', 'item_count'
         ]
 
-    def get_total_amount(self, obj):
-        """Calculate total order amount."""
-        return sum(item.price * item.quantity for item in obj.items.all())
+    def validate_status(self, value):
+        if self.instance is not None and not can_transition(self.instance.status, value):
+            raise serializers.ValidationError(f"Cannot move a {self.instance.status} order to {value}.")
+        return value
 
     def update(self, instance, validated_data):
-        """Generate an invoice if order status is marked as 'paid' and restore stock if canceled."""
+        """Restore stock if cancelled, invoices for paid orders are queued by the Order signal."""
         previous_status = instance.status
-        instance = super().update(instance, validated_data)
-
-        new_status = validated_data.get("status", instance.status)
-        
-        if new_status == 'paid' and previous_status != 'paid':
-            if not Invoice.objects.filter(order=instance).exists():
-                Invoice.objects.create(
-                    order=instance,
-                    invoice_number=f'INV-{instance.id:06d}',
-                    due_date=instance.created_at.date(),
-                    total_amount=self.get_total_amount(instance),
-                    payment_status='paid',
-                    payment_method='card'
-                )
-        
-        if new_status == 'canceled' and previous_status != 'canceled':
-            for item in instance.items.all():
-                item.product.stock += item.quantity
-                item.product.save()
-        
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if instance.status == 'cancelled' and previous_status != 'cancelled':
+                restock_orders([instance.pk])
         return instance
 
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class OrderStatusBulkSerializer(serializers.Serializer):
+    """Move many of the distributor's orders to one status."""
+    orders = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    payment_method = serializers.ChoiceField(
+        choices=Invoice.PAYMENT_METHODS, required=False, help_text="Also mark the orders paid"
+    )
+
+
+class CheckoutLineSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    """Create an order and all of its items in one transaction."""
+    customer_name = serializers.CharField(max_length=255, required=False)
+    customer_email = serializers.EmailField(required=False)
+    cart = serializers.IntegerField(required=False, help_text="Check out the items of this cart")
+    items = CheckoutLineSerializer(many=True, required=False)
+
+    def validate(self, data):
+        """Take the lines from the cart or the request and merge repeated products."""
+        if 'cart' in data:
+            cart = Cart.objects.filter(pk=data['cart'], customer=self.context['request'].user).first()
+            if cart is None:
+                raise serializers.ValidationError({"cart": "Cart not found."})
+            data['cart'] = cart
+            lines = list(cart.items.values('product', 'quantity'))
+        else:
+            lines = data.get('items', [])
+        if not lines:
+            raise serializers.ValidationError({"items": "Nothing to check out."})
+
+        quantities = {}
+        for line in lines:
+            quantities[line['product']] = quantities.get(line['product'], 0) + line['quantity']
+        data['items'] = quantities
+        return data
+
+    def create(self, validated_data):
+        """Check every line, take the stock off with one conditional UPDATE and bulk insert the items."""
+        user = self.context['request'].user
+        quantities = validated_data['items']
+        cart = validated_data.get('cart')
+
+        with transaction.atomic():
+            products = priced_products().in_bulk(list(quantities))
+            missing = [pk for pk in quantities if pk not in products]
+            if missing:
+                raise serializers.ValidationError({"items": f"Unknown products: {missing}"})
+
+            distributors = {product.distributor_id for product in products.values()}
+            if len(distributors) > 1:
+                raise serializers.ValidationError({"items": "All products must come from the same distributor."})
+
+            # Units held by other carts are not for sale, the checking out cart's own holds are.
+            held = held_quantities(list(quantities), exclude_cart=cart)
+            short = {
+                product.name: product.stock - held.get(pk, 0)
+                for pk, product in products.items() if product.stock - held.get(pk, 0) < quantities[pk]
+            }
+            if short:
+                raise serializers.ValidationError({
+                    "items": [f"Only {max(stock, 0)} units of {name} available." for name, stock in short.items()]
+                })
+
+            # Every product row must still hold enough stock when the UPDATE runs, otherwise
+            # another checkout got there first and the whole order is rolled back.
+            held = held_subquery(exclude_cart=cart)
+            updated = Product.objects.filter(
+                reduce(or_, (Q(pk=pk, stock__gte=held + quantity) for pk, quantity in quantities.items()))
+            ).update(
+                stock=Case(
+                    *(When(pk=pk, then=F('stock') - quantity) for pk, quantity in quantities.items()),
+                    default=F('stock'),
+                    output_field=PositiveIntegerField(),
+                ),
+                updated_at=timezone.now(),
+            )
+            if updated != len(quantities):
+                raise serializers.ValidationError({"items": "Stock changed during checkout, please try again."})
+
+            # Charged at the same database computed unit price the cart showed.
+            prices = {pk: product.unit_price.quantize(Decimal('0.01')) for pk, product in products.items()}
+            # bulk_create skips the OrderItem signals, so the stored totals are set up front.
+            order = Order.objects.create(
+                distributor_id=distributors.pop(),
+                customer_name=validated_data.get('customer_name') or user.username,
+                customer_email=validated_data.get('customer_email') or user.email,
+                total_amount=sum(prices[pk] * quantity for pk, quantity in quantities.items()),
+                item_count=len(quantities),
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=pk, quantity=quantity, price=prices[pk])
+                for pk, quantity in quantities.items()
+            ])
+            record_movements(
+                movement(pk, 'sale', -quantity, f"Order {order.pk}") for pk, quantity in quantities.items()
+            )
+            if cart is not None:
+                # Emptying the cart drops its holds with it.
+                cart.items.all().delete()
+        return order
+
+
+class BasketSerializer(serializers.Serializer):
+    items = CheckoutLineSerializer(many=True)
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    """Carts of the requesting customer and ad hoc baskets to price in one call."""
+    carts = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    baskets = BasketSerializer(many=True, required=False, default=list)
+
+    def validate(self, data):
+        if not data['carts'] and not data['baskets']:
+            raise serializers.ValidationError("Send carts or baskets to price.")
+        return data
+
+
+class QuoteLineSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    product_name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    list_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    discount = serializers.DecimalField(max_digits=5, decimal_places=2)
+    unit_price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    line_subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class BasketQuoteSerializer(serializers.Serializer):
+    items = QuoteLineSerializer(many=True)
+    unknown_products = serializers.ListField(child=serializers.IntegerField())
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    discount_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class InvoiceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     order_id = serializers.PrimaryKeyRelatedField(source='order', read_only=True)
 
     class Meta:
@@ -127,30 +322,37 @@ class InvoiceSerializer(serializers.ModelSerializer):
             'id', 'order_id', 'invoice_number', 'issue_date', 'due_date',
             'total_amount', 'payment_status', 'payment_method'
         ]
+        expandable_fields = {'order': OrderSerializer}
 
 
-class StockInventorySerializer(serializers.ModelSerializer):
+class StockInventorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.ReadOnlyField(source='product.name')
 
     class Meta:
         model = StockInventory
-        fields = ['id', 'product', 'product_name', 'action', 'quantity', 'timestamp', 'description']
+        fields = ['id', 'product', 'product_name', 'action', 'quantity', 'delta', 'timestamp', 'description']
+        read_only_fields = ['delta']
+        expandable_fields = {'product': ProductSerializer}
 
     def create(self, validated_data):
-        """Automatically update stock when a stock movement is recorded."""
-        product = validated_data['product']
-        action = validated_data['action']
-        quantity = validated_data['quantity']
-
-        if action == 'restock':
-            product.stock += quantity
-        elif action in ['sale', 'return', 'adjustment']:
-            if product.stock < quantity:
-                raise serializers.ValidationError(f"Not enough stock available for {product.name}.")
-            product.stock -= quantity
-        
-        product.save()
-        return super().create(validated_data)
+        """Apply the movement to the product stock and append it to the ledger."""
+        try:
+            return apply_movement(
+                validated_data['product'], validated_data['action'], validated_data['quantity'],
+                validated_data.get('description'),
+            )
+        except InsufficientStock as exc:
+            raise serializers.ValidationError(str(exc))
 
 
+class ReorderSuggestionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    product_name = serializers.ReadOnlyField(source='product.name')
+    stock = serializers.ReadOnlyField(source='product.stock')
 
+    class Meta:
+        model = ReorderSuggestion
+        fields = [
+            'id', 'product', 'product_name', 'stock', 'average_daily_demand', 'recent_daily_demand',
+            'demand_deviation', 'safety_stock', 'reorder_point', 'suggested_quantity', 'computed_at'
+        ]
+        expandable_fields = {'product': ProductSerializer}
@@ -1,21 +1,144 @@
-from django.db.models.signals import post_save
+from decimal import Decimal
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
-from datetime import timedelta
-from .models import Order, Invoice
+from .alerts import queue_stock_check
+from .cache import invalidate, owner_tags
+from .invoicing import enqueue_invoices
+from .models import Invoice, Order, OrderItem, Product, ProductCategory, StockInventory
+from .rollups import add_to_buckets, record_revenue, record_sales
+from .search import get_backend
+
+
+def adjust_order_totals(order_id, amount, count):
+    """Apply a delta to the stored order totals without reading the items, and to the sales of a paid order."""
+    Order.objects.filter(pk=order_id).update(
+        total_amount=F('total_amount') + amount,
+        item_count=F('item_count') + count,
+        updated_at=timezone.now(),
+    )
+    record_revenue(order_id, amount)
+
+
+def recompute_order_totals(order_id):
+    """Rebuild one order's totals from its items, moving a paid order's sales by the difference."""
+    orders = Order.objects.filter(pk=order_id)
+    before = orders.values_list('total_amount', flat=True).first()
+    orders.recompute_totals()
+    if before is not None:
+        record_revenue(order_id, orders.values_list('total_amount', flat=True).first() - before)
+
+
+@receiver(post_save, sender=OrderItem)
+def order_item_saved(sender, instance, created, raw=False, **kwargs):
+    """Keep Order.total_amount and Order.item_count in step with its items."""
+    if raw:
+        return
+    previous = getattr(instance, '_loaded_values', None)
+    if created:
+        adjust_order_totals(instance.order_id, instance.line_total(), 1)
+    elif previous is None or not {'order_id', 'price', 'quantity'} <= previous.keys():
+        recompute_order_totals(instance.order_id)
+    elif previous['order_id'] != instance.order_id:
+        adjust_order_totals(previous['order_id'], -previous['price'] * previous['quantity'], -1)
+        adjust_order_totals(instance.order_id, instance.line_total(), 1)
+    else:
+        # Applied even when the total is unchanged, it also moves the order's updated_at.
+        adjust_order_totals(instance.order_id, instance.line_total() - previous['price'] * previous['quantity'], 0)
+    # The price may have been assigned as a string, the stored value is a Decimal.
+    instance._loaded_values = {'order_id': instance.order_id, 'price': Decimal(instance.price), 'quantity': instance.quantity}
+
+
+@receiver(post_delete, sender=OrderItem)
+def order_item_deleted(sender, instance, **kwargs):
+    adjust_order_totals(instance.order_id, -instance.line_total(), -1)
+
+
+def counts_as_sale(payment_status, status):
+    return payment_status == 'paid' and status != 'cancelled'
+
 
 @receiver(post_save, sender=Order)
-def create_invoice(sender, instance, created, **kwargs):
+def order_saved(sender, instance, created, raw=False, **kwargs):
     """
-    Generate an invoice when an order is marked as 'paid' and doesn't already have one.
+    React to payment and status transitions: move the order in or out of the sales
+    buckets and queue its invoice once it becomes paid.
     """
-    if instance.status == 'paid' and not hasattr(instance, 'invoice'):
-        Invoice.objects.create(
-            order=instance,
-            invoice_number=f"INV-{instance.id:06d}",  # Ensures a 6-digit invoice format
-            issue_date=timezone.now().date(),
-            due_date=timezone.now().date() + timedelta(days=30),  # 30-day due period
-            total_amount=sum(item.price * item.quantity for item in instance.items.all()),  # Ensure amount is stored
-            payment_status='paid',
-            payment_method=getattr(instance, 'payment_method', 'card')  # Handle missing payment_method field
-        )
+    if raw:
+        return
+    previous = getattr(instance, '_loaded_values', {})
+
+    was_sale = counts_as_sale(previous.get('payment_status'), previous.get('status'))
+    is_sale = counts_as_sale(instance.payment_status, instance.status)
+    if was_sale != is_sale:
+        # The in-memory total may predate item changes made since the order was loaded.
+        instance.refresh_from_db(fields=['total_amount'])
+        record_sales([instance], 1 if is_sale else -1)
+
+    if instance.payment_status == 'paid' and previous.get('payment_status') != 'paid':
+        enqueue_invoices([instance.pk], getattr(instance, 'payment_method', 'card'))
+
+    instance._loaded_values = {'status': instance.status, 'payment_status': instance.payment_status}
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    """Take a deleted sale off the buckets, its items' revenue already left with their own deletion."""
+    previous = getattr(instance, '_loaded_values', {})
+    if counts_as_sale(previous.get('payment_status'), previous.get('status')):
+        add_to_buckets([(instance, -1, Decimal('0.00'))])
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_backend().index([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_backend().remove([instance.pk])
+
+
+def order_distributor(order_id):
+    return Order.objects.filter(pk=order_id).values_list('distributor_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=ProductCategory)
+def invalidate_categories(sender, **kwargs):
+    invalidate('productcategory')
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_products(sender, instance, **kwargs):
+    # Order items show the product name, and orders only hold their distributor's products.
+    invalidate(*owner_tags('product', [instance.distributor_id]), f'order:{instance.distributor_id}')
+
+
+@receiver([post_save, post_delete], sender=Order)
+def invalidate_orders(sender, instance, **kwargs):
+    invalidate(*owner_tags('order', [instance.distributor_id]))
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def invalidate_order_items(sender, instance, **kwargs):
+    invalidate(*owner_tags('order', [order_distributor(instance.order_id)]))
+
+
+@receiver([post_save, post_delete], sender=Invoice)
+def invalidate_invoices(sender, instance, **kwargs):
+    invalidate(*owner_tags('invoice', [order_distributor(instance.order_id)]))
+
+
+@receiver(post_save, sender=StockInventory)
+def invalidate_stock(sender, instance, **kwargs):
+    distributor_id = Product.objects.filter(pk=instance.product_id).values_list('distributor_id', flat=True).first()
+    invalidate('stockinventory', *owner_tags('product', [distributor_id]))
+
+
+@receiver(post_save, sender=StockInventory)
+def check_stock_level(sender, instance, created, raw=False, **kwargs):
+    """Single movements (OrderItem.save, apply_movement) are checked here, bulk ones by record_movements."""
+    if created and not raw:
+        queue_stock_check([instance.product_id])
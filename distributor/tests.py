@@ -1,3 +1,850 @@
-from django.test import TestCase
+import re
+import threading
+import time
+import unittest
+from unittest import mock
+from datetime import datetime, time as clock, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APITestCase
+
+from message.models import Message
+from message.views import MessageListCreateView
+from notification.models import Notification
+from transaction.models import Transaction
+from . import catalog, views
+from .cache import cache_stats
+from .dashboard import refresh_summaries
+from .forecasting import compute_reorder_points
+from .fulfilment import transition_orders
+from .invoicing import enqueue_invoices, mark_orders_paid, process_invoice_queue
+from .ledger import apply_movement, movement, net_movement, reconcile, record_movements, stock_at, take_snapshots
+from .reservations import reserve
+from .rollups import rebuild
+from .serializers import ProductSerializer
+from .models import Cart, CartItem, DashboardSummary, Invoice, InvoiceJob, Order, OrderItem, Product, ProductCategory, ReorderSuggestion, SalesRecord, StockInventory, StockReservation, StockSnapshot
+
+User = get_user_model()
+
+
+class ListQueryCountTests(APITestCase):
+    """The queries behind a list page do not grow with the rows or nested items on it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        cls.customer = User.objects.create_user(email='customer@example.com', username='customer', password='secret')
+        cls.category = ProductCategory.objects.create(name='Drinks')
+
+    def setUp(self):
+        cache.clear()
+
+    def add_rows(self, count):
+        for n in range(count):
+            product = Product.objects.create(
+                name=f'Product {n}', price='10.00', stock=100,
+                category=self.category, distributor=self.distributor,
+            )
+            order = Order.objects.create(
+                distributor=self.distributor, customer_name='Ada', customer_email='ada@example.com'
+            )
+            cart = Cart.objects.create(customer=self.customer)
+            for _ in range(3):
+                OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+                CartItem.objects.create(cart=cart, product=product, quantity=1)
+
+    def assertConstantQueries(self, name, user):
+        self.client.force_authenticate(user)
+        url = reverse(name)
+        self.add_rows(1)
+        with CaptureQueriesContext(connection) as baseline:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        cache.clear()
+        self.add_rows(10)
+        with self.assertNumQueries(len(baseline)):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_orders(self):
+        self.assertConstantQueries('order-list-create', self.distributor)
+
+    def test_products(self):
+        self.assertConstantQueries('product-list-create', self.distributor)
+
+    def test_carts(self):
+        self.assertConstantQueries('cart-list-create', self.customer)
+
+    def test_cart_items(self):
+        self.assertConstantQueries('cart-item-list-create', self.customer)
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Checkouts and carts racing for the last units never take more than the stock left after cart holds."""
+
+    def setUp(self):
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        self.customer = User.objects.create_user(email='customer@example.com', username='customer', password='secret')
+        category = ProductCategory.objects.create(name='Drinks')
+        self.product = Product.objects.create(
+            name='Water', price='1.00', stock=5, category=category, distributor=self.distributor
+        )
+        # Two of the five units sit in another customer's cart.
+        holder = User.objects.create_user(email='holder@example.com', username='holder', password='secret')
+        item = CartItem.objects.create(cart=Cart.objects.create(customer=holder), product=self.product, quantity=2)
+        StockReservation.objects.create(
+            cart_item=item, product=self.product, quantity=2, expires_at=timezone.now() + timedelta(minutes=15)
+        )
+
+    def race(self, buy, buyers=8):
+        barrier = threading.Barrier(buyers)
+
+        def run():
+            barrier.wait()
+            try:
+                for _ in range(50):
+                    try:
+                        buy()
+                    except OperationalError:
+                        # SQLite's shared memory database fails instead of waiting for a lock.
+                        time.sleep(0.01)
+                    else:
+                        break
+            except ValueError:
+                # Out of stock.
+                pass
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run) for _ in range(buyers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def assertNotOversold(self):
+        # Counted from the rows, a buyer can fail after its order committed.
+        sold = OrderItem.objects.filter(product=self.product).count()
+        self.product.refresh_from_db()
+        self.assertEqual(sold, 3)
+        self.assertEqual(self.product.stock, 5 - sold)
+        self.assertEqual(StockInventory.objects.filter(product=self.product, action='sale').count(), sold)
+
+    def test_checkout(self):
+        def buy():
+            client = APIClient()
+            client.force_authenticate(self.customer)
+            client.post(
+                reverse('order-checkout'), {'items': [{'product': self.product.pk, 'quantity': 1}]}, format='json'
+            )
+
+        self.race(buy)
+        self.assertNotOversold()
+
+    def test_order_items(self):
+        def buy():
+            order = Order.objects.create(
+                distributor=self.distributor, customer_name='Ada', customer_email='ada@example.com'
+            )
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price='1.00')
+
+        self.race(buy)
+        self.assertNotOversold()
+
+    def test_cart_holds(self):
+        # Items already in carts, the serializer's availability check has passed for each of them.
+        items = [
+            CartItem.objects.create(
+                cart=Cart.objects.create(customer=self.customer), product=self.product, quantity=1
+            )
+            for _ in range(8)
+        ]
+        local = threading.local()
+
+        def hold():
+            if not hasattr(local, 'item'):
+                local.item = items.pop()
+            reserve(local.item)
+
+        self.race(hold)
+        holds = StockReservation.objects.filter(product=self.product)
+        self.assertLessEqual(sum(holds.values_list('quantity', flat=True)), self.product.stock)
+        self.assertTrue(holds.filter(quantity=2).exists())
+
+
+class OrderETagTests(APITestCase):
+    """The order list validator changes with the items and products an order shows."""
+
+    def setUp(self):
+        cache.clear()
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        category = ProductCategory.objects.create(name='Drinks')
+        self.product = Product.objects.create(
+            name='Water', price='1.00', stock=10, category=category, distributor=self.distributor
+        )
+        order = Order.objects.create(distributor=self.distributor, customer_name='Ada', customer_email='ada@example.com')
+        self.item = OrderItem.objects.create(order=order, product=self.product, quantity=1, price='1.00')
+        self.client.force_authenticate(self.distributor)
+
+    def etag(self):
+        response = self.client.get(reverse('order-list-create'))
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assertETagChanges(self, change):
+        before = self.etag()
+        change()
+        cache.clear()
+        self.assertNotEqual(self.etag(), before)
+
+    def test_product_rename(self):
+        def rename():
+            self.product.name = 'Sparkling water'
+            self.product.save()
+
+        self.assertETagChanges(rename)
+
+    def test_item_change(self):
+        def change():
+            item = OrderItem.objects.get(pk=self.item.pk)
+            item.price = '2.00'
+            item.save()
+
+        self.assertETagChanges(change)
+
+
+# Plan lines that read a whole table, per database vendor.
+FULL_SCAN = {
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(?P<table>\w+)(?!.*\bINDEX\b)'),
+    'postgresql': re.compile(r'\bSeq Scan on (?P<table>\w+)'),
+}
+
+
+@unittest.skipUnless(connection.vendor in FULL_SCAN, "Query plans cannot be checked on this database.")
+class QueryPlanTests(TestCase):
+    """The querysets behind the API's list endpoints never scan a whole table."""
+
+    @staticmethod
+    def view_queryset(view_class, user):
+        """The queryset a list request to the view would run, ordered as its pages are."""
+        request = Request(RequestFactory().get('/'))
+        request.user = user
+        view = view_class(request=request, args=(), kwargs={}, format_kwarg=None, action='list')
+        queryset = view.filter_queryset(view.get_queryset())
+        ordering = getattr(view, 'cursor_ordering', None)
+        return queryset.order_by(*ordering) if ordering else queryset
+
+    def test_hot_paths(self):
+        # The plans only depend on the filter values, the user does not have to exist.
+        user = User(username='query-plans')
+        hot_paths = [
+            ('categories', self.view_queryset(views.ProductCategoryViewSet, user), {'distributor_productcategory'}),
+            ('products', self.view_queryset(views.ProductViewSet, user), set()),
+            ('products by category', self.view_queryset(views.ProductViewSet, user).filter(category=1), set()),
+            ('orders', self.view_queryset(views.OrderViewSet, user), set()),
+            ('orders by status', self.view_queryset(views.OrderViewSet, user).filter(status='pending'), set()),
+            ('order items', self.view_queryset(views.OrderItemViewSet, user), set()),
+            ('invoices', self.view_queryset(views.InvoiceViewSet, user), set()),
+            ('carts', self.view_queryset(views.CartViewSet, user), set()),
+            ('cart items', self.view_queryset(views.CartItemViewSet, user), set()),
+            ('stock movements', self.view_queryset(views.StockInventoryViewSet, user), set()),
+            ('stock movements by product', self.view_queryset(views.StockInventoryViewSet, user).filter(product=1), set()),
+            ('sales', self.view_queryset(views.SalesAnalyticsView, user), set()),
+            ('messages', self.view_queryset(MessageListCreateView, user), set()),
+            ('conversation', Message.objects.filter(sender=user, receiver=user).order_by('-timestamp'), set()),
+            ('unread notifications', Notification.objects.filter(user=user, is_read=False).order_by('-created_at'), set()),
+            ('transactions by status', Transaction.objects.filter(user=user, status='pending').order_by('-created_at'), set()),
+        ]
+        pattern = FULL_SCAN[connection.vendor]
+        for name, queryset, allowed in hot_paths:
+            with self.subTest(name):
+                plan = queryset.explain()
+                scans = [
+                    line.strip() for line in plan.splitlines()
+                    if (match := pattern.search(line)) and match.group('table') not in allowed
+                ]
+                self.assertEqual(scans, [], plan)
+
+
+class ExpandedResponseTests(APITestCase):
+    """Cached and conditional responses follow the rows that ?expand= embeds."""
+
+    def setUp(self):
+        cache.clear()
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        self.category = ProductCategory.objects.create(name='Drinks')
+        Product.objects.create(name='Water', price='1.00', stock=10, category=self.category, distributor=self.distributor)
+        self.order = Order.objects.create(
+            distributor=self.distributor, customer_name='Ada', customer_email='ada@example.com'
+        )
+        Invoice.objects.create(order=self.order, invoice_number='INV-1', due_date=timezone.now().date())
+        self.client.force_authenticate(self.distributor)
+
+    def test_product_category_rename(self):
+        url = reverse('product-list-create') + '?expand=category'
+        first = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Soft drinks'
+            self.category.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data[0]['category']['name'], 'Soft drinks')
+
+    def test_invoice_order_status(self):
+        url = reverse('invoice-list') + '?expand=order'
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.status = 'processing'
+            self.order.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data[0]['order']['status'], 'processing')
+
+
+class SalesRollupTests(TestCase):
+    """The incrementally kept sales buckets always equal a rebuild from the orders."""
+
+    def setUp(self):
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        category = ProductCategory.objects.create(name='Drinks')
+        self.product = Product.objects.create(
+            name='Water', price='1.00', stock=100, category=category, distributor=self.distributor
+        )
+        self.order = Order.objects.create(distributor=self.distributor, customer_name='Ada', customer_email='ada@example.com')
+        self.item = OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price='1.00')
+
+    def assertMatchesRebuild(self):
+        def buckets():
+            return sorted(SalesRecord.objects.filter(total_sales__gt=0).values_list('granularity', 'date', 'total_sales', 'revenue'))
+
+        kept = buckets()
+        rebuild()
+        self.assertEqual(kept, buckets())
+
+    def test_item_changes_after_payment(self):
+        self.order.payment_status = 'paid'
+        self.order.save()
+        extra = OrderItem.objects.create(order=self.order, product=self.product, quantity=3, price='2.00')
+        item = OrderItem.objects.get(pk=self.item.pk)
+        item.quantity = 5
+        item.save()
+        self.assertMatchesRebuild()
+        self.assertEqual(SalesRecord.objects.get(granularity='day').revenue, 11)
+
+        extra.delete()
+        self.assertMatchesRebuild()
+
+        order = Order.objects.get(pk=self.order.pk)
+        order.status = 'cancelled'
+        order.save()
+        self.assertMatchesRebuild()
+        self.assertFalse(SalesRecord.objects.filter(total_sales__gt=0).exists())
+
+    def test_paid_order_deleted(self):
+        self.order.payment_status = 'paid'
+        self.order.save()
+        Order.objects.get(pk=self.order.pk).delete()
+        self.assertMatchesRebuild()
+
+
+class DashboardSummaryTests(TestCase):
+    """The unpaid counters follow the orders still waiting for payment."""
+
+    def test_unpaid_orders(self):
+        distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        category = ProductCategory.objects.create(name='Drinks')
+        product = Product.objects.create(name='Water', price='1.50', stock=100, category=category, distributor=distributor)
+        for payment_status, status in [('unpaid', 'pending'), ('unpaid', 'processing'), ('paid', 'pending'), ('unpaid', 'cancelled')]:
+            order = Order.objects.create(
+                distributor=distributor, customer_name='Ada', customer_email='ada@example.com',
+                payment_status=payment_status, status=status,
+            )
+            OrderItem.objects.create(order=order, product=product, quantity=2, price=product.price)
+
+        refresh_summaries([distributor.pk])
+        summary = DashboardSummary.objects.get(distributor=distributor)
+        self.assertEqual(summary.unpaid_invoices, 2)
+        self.assertEqual(summary.unpaid_invoice_amount, 6)
+
+
+class ProductStockEditTests(TestCase):
+    """A product edited from a stale read keeps the sales made meanwhile, in the stock and in the ledger."""
+
+    def setUp(self):
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        category = ProductCategory.objects.create(name='Drinks')
+        product = Product.objects.create(name='Water', price='1.00', stock=10, category=category, distributor=self.distributor)
+        record_movements([movement(product.pk, 'restock', 10, "Opening stock")])
+        # Read before an order takes three units.
+        self.stale = Product.objects.get(pk=product.pk)
+        order = Order.objects.create(distributor=self.distributor, customer_name='Ada', customer_email='ada@example.com')
+        OrderItem.objects.create(order=order, product=product, quantity=3, price='1.00')
+
+    def edit(self, data):
+        serializer = ProductSerializer(self.stale, data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_name_edit(self):
+        self.assertEqual(self.edit({'name': 'Still water'}).stock, 7)
+        self.assertEqual(reconcile(), [])
+
+    def test_stock_edit(self):
+        self.assertEqual(self.edit({'name': 'Still water', 'stock': 20}).stock, 17)
+        self.assertEqual(reconcile(), [])
+
+    def test_stock_edit_below_sales(self):
+        with self.assertRaises(ValidationError):
+            self.edit({'name': 'Still water', 'stock': 2})
+        product = Product.objects.get(pk=self.stale.pk)
+        self.assertEqual((product.name, product.stock), ('Water', 7))
+        self.assertEqual(reconcile(), [])
+
+
+class OrderTotalsTests(TestCase):
+    """Order.total_amount and item_count follow item changes without reading the items."""
+
+    def setUp(self):
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        category = ProductCategory.objects.create(name='Drinks')
+        self.product = Product.objects.create(
+            name='Water', price='1.50', stock=1000, category=category, distributor=self.distributor
+        )
+
+    def new_order(self, items=0):
+        order = Order.objects.create(distributor=self.distributor, customer_name='Ada', customer_email='ada@example.com')
+        for _ in range(items):
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price='1.50')
+        return order
+
+    def assertTotals(self, order, amount, count):
+        order.refresh_from_db()
+        self.assertEqual((order.total_amount, order.item_count), (Decimal(amount), count))
+
+    def test_item_changes(self):
+        order, other = self.new_order(), self.new_order()
+        item = OrderItem.objects.create(order=order, product=self.product, quantity=2, price='1.50')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price='4.00')
+        self.assertTotals(order, '7.00', 2)
+
+        item.quantity = 3
+        item.save()
+        self.assertTotals(order, '8.50', 2)
+
+        item.order = other
+        item.save()
+        self.assertTotals(order, '4.00', 1)
+        self.assertTotals(other, '4.50', 1)
+
+        item.delete()
+        self.assertTotals(other, '0.00', 0)
+
+    def test_queries_do_not_grow_with_items(self):
+        def changes(order):
+            with CaptureQueriesContext(connection) as queries:
+                item = OrderItem.objects.create(order=order, product=self.product, quantity=2, price='1.50')
+                item.quantity = 3
+                item.save()
+                item.delete()
+            return [query['sql'] for query in queries]
+
+        small, large = changes(self.new_order(1)), changes(self.new_order(20))
+        self.assertEqual(len(large), len(small))
+        self.assertFalse([sql for sql in large if sql.startswith('SELECT') and '"distributor_orderitem"' in sql])
+        self.assertTotals(Order.objects.last(), '30.00', 20)
+
+    def test_stale_order_save_keeps_totals(self):
+        order = self.new_order()
+        stale = Order.objects.get(pk=order.pk)
+        OrderItem.objects.create(order=order, product=self.product, quantity=2, price='1.50')
+        stale.status = 'processing'
+        stale.save()
+        self.assertTotals(order, '3.00', 1)
+        self.assertEqual(order.status, 'processing')
+
+
+class InvoiceQueueTests(TestCase):
+    """A paid order gets exactly one invoice however often it is queued."""
+
+    def setUp(self):
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+
+    def new_order(self, **fields):
+        return Order.objects.create(distributor=self.distributor, customer_name='Ada', customer_email='ada@example.com', **fields)
+
+    def test_order_queued_twice(self):
+        order = self.new_order(payment_status='paid')
+        enqueue_invoices([order.pk])
+        enqueue_invoices([order.pk], 'paystack')
+        self.assertEqual(process_invoice_queue(), 1)
+        enqueue_invoices([order.pk])
+        self.assertEqual(process_invoice_queue(), 1)
+
+        self.assertEqual(Invoice.objects.filter(order=order).count(), 1)
+        self.assertFalse(InvoiceJob.objects.exists())
+
+    def test_mark_orders_paid(self):
+        unpaid = [self.new_order(), self.new_order()]
+        paid = self.new_order(payment_status='paid')
+        process_invoice_queue()
+
+        marked = mark_orders_paid(Order.objects.all(), 'bank_transfer')
+        self.assertCountEqual(marked, [order.pk for order in unpaid])
+        self.assertCountEqual(
+            InvoiceJob.objects.values_list('order_id', 'payment_method'),
+            [(order.pk, 'bank_transfer') for order in unpaid],
+        )
+        process_invoice_queue()
+        self.assertEqual(Invoice.objects.count(), 3)
+        self.assertEqual(Invoice.objects.get(order=paid).payment_method, 'card')
+
+
+class ProductImportTests(APITestCase):
+    """Bad rows are reported one by one, a file that cannot be imported is a 400."""
+
+    def setUp(self):
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        ProductCategory.objects.create(name='Drinks')
+        self.client.force_authenticate(self.distributor)
+
+    def upload(self, content, name='products.csv'):
+        return self.client.post(reverse('product-import'), {'file': SimpleUploadedFile(name, content)}, format='multipart')
+
+    def test_rows(self):
+        response = self.upload(
+            b'sku,name,price,stock,category\n'
+            b'W-1,Water,1.00,5,Drinks\n'
+            b'W-2,Juice,abc,5,Drinks\n'
+            b'W-3,Soda,1.00,5,Snacks\n'
+            b'W-1,Still water,1.20,8,Drinks\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 0))
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4])
+        product = Product.objects.get(distributor=self.distributor, sku='W-1')
+        self.assertEqual((product.name, product.stock), ('Still water', 8))
+
+        response = self.upload(b'{"sku": "W-1", "name": "Water", "price": "1.00", "stock": 6, "category": "Drinks"}\nnot json\n', 'products.ndjson')
+        self.assertEqual((response.data['updated'], response.data['errors']), (1, [{'row': 2, 'error': "Invalid JSON object."}]))
+        self.assertEqual(reconcile(), [])
+
+    def test_invalid_utf8(self):
+        response = self.upload(b'sku,name,price,stock,category\nW-1,Caf\xe9,1.00,5,Drinks\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Product.objects.exists())
+
+    def test_sku_created_meanwhile(self):
+        with mock.patch.object(catalog.Product.objects, 'bulk_create', side_effect=IntegrityError):
+            response = self.upload(b'sku,name,price,stock,category\nW-1,Water,1.00,5,Drinks\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertFalse(StockInventory.objects.exists())
+
+
+class ResponseCacheTests(APITestCase):
+    """Cached responses are dropped once the write that changes them commits, and only then."""
+
+    def setUp(self):
+        cache.clear()
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com', username='other', role='Distributor', password='secret'
+        )
+        category = ProductCategory.objects.create(name='Drinks')
+        self.product = Product.objects.create(
+            name='Water', price='1.00', stock=10, category=category, distributor=self.distributor
+        )
+        self.other_product = Product.objects.create(
+            name='Tea', price='1.00', stock=10, category=category, distributor=self.other
+        )
+
+    def get(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse('product-list-create'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_invalidated_on_commit(self):
+        self.assertEqual(self.get(self.distributor)['X-Cache'], 'MISS')
+        self.assertEqual(self.get(self.other)['X-Cache'], 'MISS')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.name = 'Still water'
+            self.product.save()
+            # Not committed yet, readers keep the cached rows.
+            self.assertEqual(self.get(self.distributor)['X-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+
+        response = self.get(self.distributor)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data[0]['name'], 'Still water')
+        # Another distributor's products are tagged apart.
+        self.assertEqual(self.get(self.other)['X-Cache'], 'HIT')
+        self.assertEqual(cache_stats()['hits'], 2)
+
+
+class StockLedgerTests(TestCase):
+    """Balances come from the newest snapshot plus the movements after it, and drift is caught."""
+
+    def setUp(self):
+        distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        category = ProductCategory.objects.create(name='Drinks')
+        self.product = Product.objects.create(name='Water', price='1.00', stock=10, category=category, distributor=distributor)
+        record_movements([movement(self.product.pk, 'restock', 10, "Opening stock")])
+
+    def test_balances_from_snapshots(self):
+        apply_movement(self.product, 'sale', 3)
+        self.assertEqual(take_snapshots(), 1)
+        self.assertEqual(take_snapshots(), 0)
+        middle = timezone.now()
+        apply_movement(self.product, 'restock', 5)
+        apply_movement(self.product, 'adjustment', 2)
+
+        snapshot = StockSnapshot.objects.get(product=self.product)
+        self.assertEqual(snapshot.balance, 7)
+        self.assertEqual(stock_at(self.product, middle), 7)
+        self.assertEqual(stock_at(self.product, timezone.now()), 10)
+        self.assertEqual(net_movement(self.product, middle, timezone.now()), 3)
+        self.assertEqual(reconcile(), [])
+
+    def test_reconcile_drift(self):
+        take_snapshots()
+        Product.objects.filter(pk=self.product.pk).update(stock=15)
+        self.assertEqual(reconcile(), [(self.product.pk, 15, 10)])
+
+        reconcile(fix=True)
+        self.assertEqual(reconcile(), [])
+        self.assertEqual(StockInventory.objects.filter(product=self.product).last().delta, 5)
+
+
+class ReorderPointTests(TestCase):
+    """Suggestions computed from a fixed two-week sales history."""
+
+    def setUp(self):
+        distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        category = ProductCategory.objects.create(name='Drinks')
+        self.steady, self.spiky, self.idle = (
+            Product.objects.create(name=name, price='1.00', stock=stock, category=category, distributor=distributor)
+            for name, stock in (('Steady', 10), ('Spiky', 100), ('Idle', 0))
+        )
+        self.start = timezone.localdate() - timedelta(days=13)
+
+    def sell(self, product, day, delta, action='sale'):
+        movement = StockInventory.objects.create(product=product, action=action, quantity=abs(delta), delta=delta)
+        noon = timezone.make_aware(datetime.combine(self.start + timedelta(days=day), clock(12)))
+        StockInventory.objects.filter(pk=movement.pk).update(timestamp=noon)
+
+    def test_fixed_history(self):
+        for day in range(14):
+            self.sell(self.steady, day, -2)
+        # A cancellation nets out against the day's sales.
+        self.sell(self.steady, 3, -1)
+        self.sell(self.steady, 3, 1, 'cancellation')
+        self.sell(self.spiky, 0, -7)
+
+        self.assertEqual(compute_reorder_points(history_days=14, lead_time=7, review=7, service_factor=1.65), 3)
+        suggestions = {
+            suggestion.product_id: suggestion for suggestion in ReorderSuggestion.objects.all()
+        }
+        steady, spiky, idle = (suggestions[product.pk] for product in (self.steady, self.spiky, self.idle))
+        self.assertEqual(
+            (steady.average_daily_demand, steady.recent_daily_demand, steady.demand_deviation),
+            (Decimal('2.00'), Decimal('2.00'), Decimal('0.00')),
+        )
+        self.assertEqual((steady.safety_stock, steady.reorder_point, steady.suggested_quantity), (0, 14, 18))
+        self.assertEqual(
+            (spiky.average_daily_demand, spiky.recent_daily_demand, spiky.demand_deviation),
+            (Decimal('0.50'), Decimal('0.00'), Decimal('1.80')),
+        )
+        # Spiky demand needs safety stock, but the stock is well above the reorder point.
+        self.assertEqual((spiky.safety_stock, spiky.reorder_point, spiky.suggested_quantity), (8, 12, 0))
+        self.assertEqual((idle.reorder_point, idle.suggested_quantity), (0, 0))
+
+
+class CartPricingTests(APITestCase):
+    """Cart and quote prices are computed in the database and match Product.discounted_price."""
+
+    def setUp(self):
+        cache.clear()
+        distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        self.customer = User.objects.create_user(email='customer@example.com', username='customer', password='secret')
+        category = ProductCategory.objects.create(name='Drinks')
+        self.juice = Product.objects.create(
+            name='Juice', price='10.00', discount='15.00', stock=100, category=category, distributor=distributor
+        )
+        self.water = Product.objects.create(
+            name='Water', price='3.33', discount='10.00', stock=100, category=category, distributor=distributor
+        )
+        self.cart = Cart.objects.create(customer=self.customer)
+        CartItem.objects.create(cart=self.cart, product=self.juice, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.water, quantity=3)
+        self.client.force_authenticate(self.customer)
+
+    def test_cart_totals(self):
+        cart = self.client.get(reverse('cart-list-create')).data[0]
+        self.assertEqual(
+            (cart['subtotal'], cart['discount_total'], cart['total']), ('29.99', '3.99', '26.00')
+        )
+        prices = {item['product']: item['unit_price'] for item in cart['items']}
+        self.assertEqual(prices, {self.juice.pk: '8.50', self.water.pk: '3.00'})
+        self.assertEqual(round(Product.objects.get(pk=self.water.pk).discounted_price(), 2), Decimal('3.00'))
+
+    def test_quote(self):
+        other = Cart.objects.create(customer=User.objects.create_user(
+            email='other@example.com', username='other', password='secret'
+        ))
+        response = self.client.post(reverse('cart-quote'), {
+            'carts': [self.cart.pk, other.pk],
+            'baskets': [{'items': [{'product': self.juice.pk, 'quantity': 1}, {'product': 0, 'quantity': 1}]}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([cart['id'] for cart in response.data['carts']], [self.cart.pk])
+        basket = response.data['baskets'][0]
+        self.assertEqual((basket['total'], basket['discount_total'], basket['unknown_products']), ('8.50', '1.50', [0]))
+
+
+class BulkOrderStatusTests(APITestCase):
+    """One transition for many orders: the state machine, restocking and side effects in bulk."""
+
+    def setUp(self):
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        category = ProductCategory.objects.create(name='Drinks')
+        self.product = Product.objects.create(
+            name='Water', price='2.00', stock=1000, category=category, distributor=self.distributor
+        )
+        record_movements([movement(self.product.pk, 'restock', 1000, "Opening stock")])
+        self.client.force_authenticate(self.distributor)
+
+    def new_order(self, distributor=None, **fields):
+        order = Order.objects.create(
+            distributor=distributor or self.distributor, customer_name='Ada', customer_email='ada@example.com', **fields
+        )
+        OrderItem.objects.create(order=order, product=self.product, quantity=3, price='2.00')
+        return order
+
+    def transition(self, orders, status, **data):
+        response = self.client.post(
+            reverse('order-bulk-status'), {'orders': [order.pk for order in orders], 'status': status, **data}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cancel(self):
+        paid = self.new_order(payment_status='paid')
+        processing = self.new_order(status='processing')
+        delivered = self.new_order(status='delivered')
+        elsewhere = self.new_order(User.objects.create_user(email='other@example.com', username='other', password='secret'))
+
+        data = self.transition([paid, processing, delivered, elsewhere], 'cancelled')
+        self.assertCountEqual(data['updated'], [paid.pk, processing.pk])
+        self.assertEqual(list(data['rejected']), [delivered.pk])
+        self.assertEqual(data['not_found'], [elsewhere.pk])
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1000 - 2 * 3)
+        self.assertEqual(reconcile(), [])
+        self.assertFalse(SalesRecord.objects.filter(total_sales__gt=0).exists())
+        self.assertEqual(
+            list(Notification.objects.filter(user=self.distributor).values_list('message', flat=True)),
+            ["2 orders marked cancelled."],
+        )
+
+    def test_queries_do_not_grow_with_orders(self):
+        def queries(count):
+            shipped, cancelled = [self.new_order(status='processing') for _ in range(count)], [self.new_order() for _ in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(len(self.transition(shipped, 'shipped', payment_method='card')['updated']), count)
+                self.assertEqual(len(self.transition(cancelled, 'cancelled')['updated']), count)
+            return len(queries)
+
+        # The first paid orders of the day create its sales buckets, later ones update them.
+        queries(1)
+        self.assertEqual(queries(20), queries(2))
+        self.assertEqual(InvoiceJob.objects.count(), 23)
+
+
+class LowStockAlertTests(TestCase):
+    """Distributors are told once when a product falls to its threshold, in one message per batch."""
+
+    def setUp(self):
+        self.distributor = User.objects.create_user(
+            email='distributor@example.com', username='distributor', role='Distributor', password='secret'
+        )
+        category = ProductCategory.objects.create(name='Drinks', reorder_threshold=5)
+        self.water, self.juice, self.tea = (
+            Product.objects.create(
+                name=name, price='1.00', stock=10, reorder_threshold=threshold, category=category, distributor=self.distributor
+            )
+            for name, threshold in (('Water', None), ('Juice', 2), ('Tea', 0))
+        )
+
+    def alerts(self):
+        return list(Notification.objects.filter(user=self.distributor, message__startswith='Low stock').order_by('pk').values_list('message', flat=True))
+
+    def sell(self, product, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(product, 'sale', quantity)
+
+    def test_alerted_once_per_crossing(self):
+        self.sell(self.water, 4)
+        self.assertEqual(self.alerts(), [])
+        self.sell(self.water, 1)
+        self.sell(self.water, 1)
+        self.assertEqual(self.alerts(), ["Low stock: Water (5 left)"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(self.water, 'restock', 10)
+        self.sell(self.water, 12)
+        self.assertEqual(self.alerts(), ["Low stock: Water (5 left)", "Low stock: Water (2 left)"])
+
+    def test_batched_by_distributor(self):
+        order = Order.objects.create(distributor=self.distributor, customer_name='Ada', customer_email='ada@example.com')
+        with self.captureOnCommitCallbacks(execute=True):
+            for product, quantity in ((self.water, 6), (self.juice, 8), (self.tea, 9)):
+                OrderItem.objects.create(order=order, product=product, quantity=quantity, price='1.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_orders(Order.objects.filter(pk=order.pk), 'cancelled')
+        self.assertEqual(self.alerts(), ["Low stock: Water (4 left)", "Low stock: Juice (2 left)"])
@@ -2,7 +2,9 @@ from django.urls import path
 from .views import (
     ProductCategoryViewSet, ProductViewSet, OrderViewSet,
     OrderItemViewSet, InvoiceViewSet, CartViewSet,
-    CartItemViewSet, StockInventoryViewSet, SalesAnalyticsView
+    CartItemViewSet, StockInventoryViewSet, SalesAnalyticsView, CheckoutView,
+    StockBalanceView, ProductImportView, ProductExportView, CartQuoteView,
+    OrderBulkStatusView, DashboardView, ReorderSuggestionViewSet
 )
 
 urlpatterns = [
@@ -12,10 +14,14 @@ urlpatterns = [
 
     # Products
     path('products/', ProductViewSet.as_view({'get': 'list', 'post': 'create'}), name='product-list-create'),
+    path('products/import/', ProductImportView.as_view(), name='product-import'),
+    path('products/export/', ProductExportView.as_view(), name='product-export'),
     path('products/<int:pk>/', ProductViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='product-detail'),
 
     # Orders
     path('orders/', OrderViewSet.as_view({'get': 'list', 'post': 'create'}), name='order-list-create'),
+    path('orders/checkout/', CheckoutView.as_view(), name='order-checkout'),
+    path('orders/bulk-status/', OrderBulkStatusView.as_view(), name='order-bulk-status'),
     path('orders/<int:pk>/', OrderViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='order-detail'),
 
     # Order Items
@@ -28,6 +34,7 @@ urlpatterns = [
 
     # Carts
     path('carts/', CartViewSet.as_view({'get': 'list', 'post': 'create'}), name='cart-list-create'),
+    path('carts/quote/', CartQuoteView.as_view(), name='cart-quote'),
     path('carts/<int:pk>/', CartViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='cart-detail'),
 
     # Cart Items
@@ -36,7 +43,13 @@ urlpatterns = [
 
     # Stock Inventory
     path('stock-inventory/', StockInventoryViewSet.as_view({'get': 'list', 'post': 'create'}), name='stock-inventory-list'),
-    path('stock-inventory/<int:pk>/', StockInventoryViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='stock-inventory-detail'),
+    path('stock-inventory/balance/', StockBalanceView.as_view(), name='stock-inventory-balance'),
+    path('stock-inventory/<int:pk>/', StockInventoryViewSet.as_view({'get': 'retrieve'}), name='stock-inventory-detail'),
+
+    # Reorder Suggestions (ReadOnly)
+    path('reorder-suggestions/', ReorderSuggestionViewSet.as_view({'get': 'list'}), name='reorder-suggestion-list'),
+    path('reorder-suggestions/<int:pk>/', ReorderSuggestionViewSet.as_view({'get': 'retrieve'}), name='reorder-suggestion-detail'),
 
     path("sales/", SalesAnalyticsView.as_view(), name="sales_analytics"),
+    path("dashboard/", DashboardView.as_view(), name="dashboard"),
 ]
@@ -1,50 +1,105 @@
-from rest_framework import generics, permissions, viewsets, filters
-from rest_framework.exceptions import PermissionDenied
-from django.db.models import Sum
+from rest_framework import generics, mixins, permissions, viewsets, filters, status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from django.db.models import Prefetch, Sum
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import ProductCategory, Product, Order, OrderItem, Invoice, Cart, CartItem, StockInventory,SalesRecord
+from .models import ProductCategory, Product, Order, OrderItem, Invoice, Cart, CartItem, StockInventory,SalesRecord, ReorderSuggestion
+from cyriox.pagination import KeysetPagination
+from cyriox.renderers import StreamingListMixin
+from .cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin
+from .fieldsets import SparseQuerysetMixin
+from .catalog import FORMATS, ImportAborted, export_rows, guess_format, import_products, read_rows
+from .dashboard import get_summary, revenue
+from .fulfilment import transition_orders
+from .ledger import net_movement, stock_at
+from .pricing import priced_carts, priced_cart_items, quote_baskets
+from .reservations import reserve
+from .rollups import TRUNCATE, period_start
+from .search import ProductSearchFilter
 from .serializers import (
     ProductCategorySerializer, ProductSerializer,
     OrderSerializer, OrderItemSerializer, InvoiceSerializer,
-    CartSerializer, CartItemSerializer, StockInventorySerializer, SalesRecordSerializer
+    CartSerializer, CartItemSerializer, StockInventorySerializer, SalesRecordSerializer,
+    CheckoutSerializer, OrderStatusBulkSerializer, ReorderSuggestionSerializer, QuoteRequestSerializer, BasketQuoteSerializer
 )
 from rest_framework import generics
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date, parse_datetime
 
 class SalesAnalyticsView(generics.ListAPIView):
+    """Sales totals and time series read from the rolled up sales buckets."""
     serializer_class = SalesRecordSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return SalesRecord.objects.filter(distributor=self.request.user)
-    
+        params = self.request.query_params
+        granularity = params.get("granularity", "day")
+        if granularity not in TRUNCATE:
+            raise ValidationError({"granularity": f"Choose one of {', '.join(TRUNCATE)}."})
+
+        queryset = SalesRecord.objects.filter(distributor=self.request.user, granularity=granularity)
+        for param, lookup in (("from", "date__gte"), ("to", "date__lte")):
+            if param in params:
+                day = parse_date(params[param])
+                if day is None:
+                    raise ValidationError({param: "Expected a YYYY-MM-DD date."})
+                if param == "from":
+                    # Include the bucket the start date falls into.
+                    day = period_start(day, granularity)
+                queryset = queryset.filter(**{lookup: day})
+        return queryset.order_by("date")
+
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        total_sales = queryset.aggregate(total_sales=Sum("total_sales"))["total_sales"] or 0
-        total_revenue = queryset.aggregate(total_revenue=Sum("revenue"))["total_revenue"] or 0
-        
+        records = list(self.get_queryset())
+        total_sales = sum((record.total_sales for record in records), 0)
+        total_revenue = sum((record.revenue for record in records), 0)
+
         return Response({
+            "granularity": request.query_params.get("granularity", "day"),
             "total_sales": total_sales,
             "total_revenue": total_revenue,
-            "sales_records": SalesRecordSerializer(queryset, many=True).data
+            "sales_records": SalesRecordSerializer(records, many=True, context=self.get_serializer_context()).data
+        })
+
+class DashboardView(APIView):
+    """Home screen summary of the distributor, read from precomputed counters and the sales rollups."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        summary = get_summary(request.user)
+        return Response({
+            "orders_by_status": {key: summary.orders_by_status.get(key, 0) for key, _ in Order.STATUS_CHOICES},
+            "revenue": revenue(request.user),
+            "low_stock_products": summary.low_stock_products,
+            "unpaid_invoices": summary.unpaid_invoices,
+            "unpaid_invoice_amount": summary.unpaid_invoice_amount,
+            "unread_notifications": summary.unread_notifications,
+            "refreshed_at": summary.refreshed_at,
         })
 
 # Product Category Views
-class ProductCategoryViewSet(viewsets.ModelViewSet):
+class ProductCategoryViewSet(SparseQuerysetMixin, ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = ProductCategory.objects.all()
     serializer_class = ProductCategorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_tags = ('productcategory',)
+    cache_scoped = False
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     search_fields = ['name', 'description']
     
 # Product Views
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SparseQuerysetMixin, ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    cache_tags = ('product',)
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
     search_fields = ['name', 'description']
     filterset_fields = ['category', 'distributor']
 
@@ -55,65 +110,133 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer.save(distributor=self.request.user)
 
 # Order Views
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseQuerysetMixin, ConditionalGetMixin, CachedResponseMixin, StreamingListMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_tags = ('order',)
+    # Item changes move Order.updated_at, the product names shown on the items do not.
+    related_last_modified_fields = ('items__product__updated_at',)
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     search_fields = ['customer_name', 'status']
     filterset_fields = ['status']
 
     def get_queryset(self):
-        return Order.objects.filter(distributor=self.request.user).select_related('distributor')
+        items = OrderItem.objects.select_related('product').only(
+            'id', 'order_id', 'product_id', 'quantity', 'price', 'product__name'
+        )
+        return Order.objects.filter(distributor=self.request.user).prefetch_related(
+            Prefetch('items', queryset=items)
+        )
 
     def perform_update(self, serializer):
         order = serializer.instance
         if order.distributor != self.request.user:
             raise PermissionDenied("You do not have permission to modify this order.")
 
-        new_status = self.request.data.get("status")
-        if new_status == "paid" and not hasattr(order, 'invoice'):
-            Invoice.objects.create(
-                order=order,
-                invoice_number=f"INV-{order.id:06d}",
-                issue_date=timezone.now().date(),
-                due_date=timezone.now().date() + timedelta(days=30),
-                total_amount=sum(item.price * item.quantity for item in order.items.all()),
-                payment_status="paid",
-                payment_method=self.request.data.get("payment_method", "card")
-            )
+        payment_method = self.request.data.get("payment_method", "card")
+        if payment_method not in dict(Invoice.PAYMENT_METHODS):
+            raise ValidationError({"payment_method": f"Choose one of {', '.join(dict(Invoice.PAYMENT_METHODS))}."})
+        # Picked up by the Order signal when the order becomes paid.
+        order.payment_method = payment_method
         serializer.save()
 
+class CheckoutView(generics.CreateAPIView):
+    """Place an order with all of its items in a single request."""
+    serializer_class = CheckoutSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order = serializer.save()
+        order = Order.objects.prefetch_related('items__product').get(pk=order.pk)
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+
+class OrderBulkStatusView(APIView):
+    """Apply one status transition to many orders."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = OrderStatusBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        requested = set(data['orders'])
+
+        orders = Order.objects.filter(distributor=request.user, pk__in=requested)
+        updated, rejected = transition_orders(orders, data['status'], data.get('payment_method'))
+        found = set(orders.values_list('pk', flat=True))
+        return Response({
+            "status": data['status'],
+            "updated": updated,
+            "rejected": rejected,
+            "not_found": sorted(requested - found),
+        })
+
 # Order Item Views
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = OrderItemSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-id',)
 
     def get_queryset(self):
         return OrderItem.objects.filter(order__distributor=self.request.user).select_related('product', 'order')
 
 # Invoice Views
-class InvoiceViewSet(viewsets.ReadOnlyModelViewSet):
+class InvoiceViewSet(SparseQuerysetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = InvoiceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_tags = ('invoice',)
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-id',)
 
     def get_queryset(self):
         return Invoice.objects.filter(order__distributor=self.request.user).select_related('order')
 
 # Cart Views
-class CartViewSet(viewsets.ModelViewSet):
+class CartViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Cart.objects.filter(customer=self.request.user)
+        return self.priced(Cart.objects.filter(customer=self.request.user))
+
+    @staticmethod
+    def priced(carts):
+        """Carts with their totals and priced items, in one query each."""
+        items = priced_cart_items(CartItem.objects.select_related('product').only(
+            'id', 'cart_id', 'product_id', 'quantity', 'added_at', 'product__name'
+        ))
+        return priced_carts(carts).prefetch_related(Prefetch('items', queryset=items))
+
+
+class CartQuoteView(APIView):
+    """Price many of the customer's carts and ad hoc baskets in one call."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = QuoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart_ids = serializer.validated_data['carts']
+        baskets = [basket['items'] for basket in serializer.validated_data['baskets']]
+
+        carts = CartViewSet.priced(Cart.objects.filter(customer=request.user, pk__in=cart_ids))
+        return Response({
+            "carts": CartSerializer(carts, many=True).data,
+            "baskets": BasketQuoteSerializer(quote_baskets(baskets), many=True).data,
+        })
 
 # Cart Item Views
-class CartItemViewSet(viewsets.ModelViewSet):
+class CartItemViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = CartItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return CartItem.objects.filter(cart__customer=self.request.user).select_related('product', 'cart')
+        return priced_cart_items(
+            CartItem.objects.filter(cart__customer=self.request.user).select_related('product', 'cart')
+        )
 
     def perform_create(self, serializer):
         cart = serializer.validated_data['cart']
@@ -122,12 +245,110 @@ class CartItemViewSet(viewsets.ModelViewSet):
             existing_distributor = cart.items.first().product.distributor
             if existing_distributor != product.distributor:
                 raise PermissionDenied("You can only add products from the same distributor to your cart.")
-        serializer.save()
+        item = serializer.save()
+        if not reserve(item):
+            item.delete()
+            raise ValidationError(f"Not enough stock available for {product.name}.")
+
+    def perform_update(self, serializer):
+        previous_quantity = serializer.instance.quantity
+        item = serializer.save()
+        if not reserve(item):
+            item.quantity = previous_quantity
+            item.save(update_fields=['quantity'])
+            reserve(item)
+            raise ValidationError(f"Not enough stock available for {item.product.name}.")
 
 # Stock Inventory Views
-class StockInventoryViewSet(viewsets.ModelViewSet):
+class StockInventoryViewSet(SparseQuerysetMixin, CachedResponseMixin, StreamingListMixin, mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Stock movements can be recorded and read but never changed or removed."""
     queryset = StockInventory.objects.all().order_by('-timestamp')
     serializer_class = StockInventorySerializer
     permission_classes = [IsAuthenticated]
+    cache_tags = ('stockinventory',)
+    cache_scoped = False
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-timestamp', '-id')
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product', 'action']
+
+
+class ReorderSuggestionViewSet(SparseQuerysetMixin, viewsets.ReadOnlyModelViewSet):
+    """Suggested restocks of the distributor's products, ?needs_reorder=true for the ones due now."""
+    serializer_class = ReorderSuggestionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-suggested_quantity', '-id')
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['product']
+
+    def get_queryset(self):
+        queryset = ReorderSuggestion.objects.filter(product__distributor=self.request.user).select_related('product')
+        if self.request.query_params.get('needs_reorder') == 'true':
+            queryset = queryset.filter(suggested_quantity__gt=0)
+        return queryset.order_by(*self.cursor_ordering)
+
+
+class StockBalanceView(APIView):
+    """Stock of a product at a point in time, or its net movement over a range."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        product = get_object_or_404(Product, pk=request.query_params.get('product'), distributor=request.user)
+        start = self._parse(request, 'from')
+        end = self._parse(request, 'to')
+        if start and end:
+            return Response({
+                "product": product.pk,
+                "from": start,
+                "to": end,
+                "net_movement": net_movement(product, start, end),
+            })
+        at = self._parse(request, 'at') or timezone.now()
+        return Response({"product": product.pk, "at": at, "stock": stock_at(product, at)})
+
+    @staticmethod
+    def _parse(request, param):
+        value = request.query_params.get(param)
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValidationError({param: "Expected an ISO 8601 datetime."})
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+class ProductImportView(APIView):
+    """Upsert the distributor's catalog from an uploaded CSV or NDJSON file."""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({"file": "Upload a CSV or NDJSON file."})
+        fmt = request.query_params.get('file_format') or guess_format(upload.name)
+        if fmt not in FORMATS:
+            raise ValidationError({"file_format": f"Choose one of {', '.join(FORMATS)}."})
+
+        try:
+            report = import_products(request.user, read_rows(upload.file, fmt))
+        except ImportAborted as exc:
+            return Response({"error": str(exc), **exc.report}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class ProductExportView(APIView):
+    """Stream the distributor's catalog as CSV or NDJSON."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in FORMATS:
+            raise ValidationError({"file_format": f"Choose one of {', '.join(FORMATS)}."})
+
+        products = Product.objects.filter(distributor=request.user)
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(export_rows(products, fmt), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="products.{fmt}"'
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message', '0002_fileupload_remove_message_content_message_text_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['timestamp', 'id'], name='message_mes_timesta_8ceb0a_idx'),
+        ),
+    ]
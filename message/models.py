@@ -24,5 +24,11 @@ class Message(models.Model):
     )  # Attach file
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['sender', 'receiver', 'timestamp']),
+        ]
+
     def __str__(self):
         return f"Message from {self.sender} to {self.receiver}"
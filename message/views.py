@@ -8,6 +8,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.http import Http404
+from cyriox.pagination import KeysetPagination
+from cyriox.renderers import StreamingListMixin
 
 class FileUploadView(APIView):
     parser_classes = (MultiPartParser, FormParser)
@@ -33,8 +35,10 @@ class FileDeleteView(APIView):
         except FileUpload.DoesNotExist:
             raise Http404("File not found")
 
-class MessageListCreateView(generics.ListCreateAPIView):
+class MessageListCreateView(StreamingListMixin, generics.ListCreateAPIView):
     queryset = Message.objects.all().order_by('-timestamp')
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-timestamp', '-id')
 
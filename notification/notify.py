@@ -0,0 +1,32 @@
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from .models import Notification
+
+
+def notify(messages):
+    """Store (user_id, message) notifications with one insert and push them once committed."""
+    notifications = Notification.objects.bulk_create(
+        [Notification(user_id=user_id, message=message) for user_id, message in messages]
+    )
+    # Delivery is best effort, the stored rows are what the user can always read back.
+    transaction.on_commit(lambda: push(notifications), robust=True)
+    return notifications
+
+
+def push(notifications):
+    """Send notifications to the users' NotificationConsumer groups."""
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    send = async_to_sync(channel_layer.group_send)
+    for notification in notifications:
+        send(f"notifications_{notification.user_id}", {
+            "type": "send_notification",
+            "data": {
+                "id": notification.pk,
+                "message": notification.message,
+                "created_at": notification.created_at.isoformat(),
+            },
+        })
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+
+import aiohttp
+
+from .paystack import (
+    IDEMPOTENT_METHODS, MAX_ATTEMPTS, PAYSTACK_BASE_URL, PAYSTACK_SECRET_KEY, RETRY_STATUSES,
+    backoff, endpoint_label, get_timeout, record,
+)
+
+logger = logging.getLogger(__name__)
+
+# Connections one event loop keeps to Paystack, every in-flight call needs one
+POOL_SIZE = int(os.getenv("PAYSTACK_ASYNC_POOL_SIZE", 200))
+
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_session():
+    """The running event loop's pooled keep-alive session, aiohttp sessions cannot be shared across loops."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = _sessions[loop] = aiohttp.ClientSession(
+            PAYSTACK_BASE_URL,
+            headers={"Authorization": f"Bearer {PAYSTACK_SECRET_KEY}", "Content-Type": "application/json"},
+            connector=aiohttp.TCPConnector(limit=POOL_SIZE),
+            # Concurrent calls share the session, nothing may be kept between them.
+            cookie_jar=aiohttp.DummyCookieJar(),
+        )
+    return session
+
+
+async def aclose_session():
+    """Close the running loop's session, for loops that end before the process does."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+async def asend(method, endpoint, payload=None):
+    """
+    Async send(): same timeouts, retry policy and metrics as the sync client.
+
+    Returns the status code and decoded body, the connection goes back to the pool once it is read.
+    """
+    label = endpoint_label(endpoint)
+    connect, read = get_timeout(endpoint)
+    # Waiting for a free pooled connection counts against the read timeout.
+    timeout = aiohttp.ClientTimeout(total=None, connect=read, sock_connect=connect, sock_read=read)
+    attempts = MAX_ATTEMPTS if method in IDEMPOTENT_METHODS else 1
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        started = time.perf_counter()
+        try:
+            async with get_session().request(method, endpoint, json=payload, timeout=timeout) as response:
+                status, data = response.status, await response.json(content_type=None)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            record(label, time.perf_counter() - started, error=True, retried=not last)
+            if last:
+                raise
+            logger.warning(f"Paystack {method} {label} attempt {attempt + 1} failed: {e!r}")
+        else:
+            failed = status in RETRY_STATUSES
+            record(label, time.perf_counter() - started, error=status >= 400, retried=failed and not last)
+            if not failed or last:
+                return status, data
+            logger.warning(f"Paystack {method} {label} attempt {attempt + 1} returned {status}")
+        await asyncio.sleep(backoff(attempt))
+
+
+async def amake_request(method, endpoint, payload=None):
+    """Async make_request(), with the same return values."""
+    if method not in ("GET", "POST"):
+        logger.error(f"Unsupported request method: {method}")
+        return {"status": False, "message": "Invalid request method"}
+
+    try:
+        status, response_data = await asend(method, endpoint, payload)
+        if not isinstance(response_data, dict):
+            # A proxy or an outage page can answer with any JSON value.
+            logger.warning(f"Paystack API error - Endpoint: {endpoint}, Response: {response_data!r}")
+            return {"status": False, "message": "Request failed", "details": response_data}
+
+        if status in [200, 201] and response_data.get("status"):
+            return response_data
+        logger.warning(f"Paystack API error - Endpoint: {endpoint}, Response: {response_data}")
+        return {"status": False, "message": response_data.get("message", "Request failed"), "details": response_data}
+
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        logger.error(f"Paystack API request failed: {e!r}")
+        return {"status": False, "message": "Paystack API request failed", "error": str(e)}
+
+
+async def ainitialize_transaction(email, amount):
+    """Initialize a transaction with Paystack."""
+    payload = {
+        "email": email,
+        "amount": int(amount) * 100,  # Convert to kobo
+        "currency": "NGN"
+    }
+    logger.info(f"Initializing transaction for {email} with amount {amount}")
+    return await amake_request("POST", "/transaction/initialize", payload)
+
+
+async def averify_transaction(reference):
+    """Verify a Paystack transaction."""
+    logger.info(f"Verifying transaction reference: {reference}")
+    return await amake_request("GET", f"/transaction/verify/{reference}")
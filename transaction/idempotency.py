@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+POLL_SECONDS = 0.1
+# A first request that has not stored its response after this long is assumed to have died
+ABANDONED_AFTER = timedelta(minutes=1)
+
+
+def client_identity(request, user):
+    """Who sent the request, so two clients that pick the same key never see each other's response."""
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def claim(scope, client, key, fingerprint):
+    """The key's record and whether this request created it, None when it vanished meanwhile."""
+    now = timezone.now()
+    # Expired keys and keys held by a request that died are free again.
+    IdempotencyKey.objects.filter(scope=scope, client=client, key=key).filter(
+        Q(created_at__lt=now - timedelta(hours=settings.IDEMPOTENCY_KEY_HOURS))
+        | Q(status_code__isnull=True, created_at__lt=now - ABANDONED_AFTER)
+    ).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(scope=scope, client=client, key=key, fingerprint=fingerprint), True
+    except IntegrityError:
+        return lookup(scope, client, key), False
+
+
+def lookup(scope, client, key):
+    return IdempotencyKey.objects.filter(scope=scope, client=client, key=key).first()
+
+
+def answer(record, fingerprint):
+    """The response for a repeat of record's request, None while the first request is still running."""
+    if record.fingerprint != fingerprint:
+        return JsonResponse({"error": f"{HEADER} was already used with a different request"}, status=422)
+    if record.status_code is None:
+        return None
+    return JsonResponse(record.response, status=record.status_code, safe=False, headers={"Idempotent-Replayed": "true"})
+
+
+def in_progress():
+    return JsonResponse(
+        {"error": f"A request with this {HEADER} is still in progress"}, status=409, headers={"Retry-After": "1"}
+    )
+
+
+def not_replayed(response):
+    """Mark a failure that is not the request's fault, e.g. Paystack being down, so its key is freed for a retry."""
+    response.replayable = False
+    return response
+
+
+def finish(record, response):
+    """Store response for replay, or free the key after a server or upstream error so a retry runs again."""
+    if response is None or response.status_code >= 500 or not getattr(response, "replayable", True):
+        record.delete()
+        return
+    record.status_code = response.status_code
+    record.response = response.data if hasattr(response, "data") else json.loads(response.content)
+    record.save(update_fields=["status_code", "response"])
+
+
+def idempotent(scope):
+    """
+    Run a view once per Idempotency-Key and replay its response to repeats.
+
+    Repeats that arrive while the first request runs wait for its response instead of
+    calling Paystack again; if it fails they answer 409 and the client's next retry runs
+    the view. Keys belong to the authenticated user, or the client address for anonymous
+    requests. Requests without the header are not affected.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                key = request.headers.get(HEADER)
+                if not key:
+                    return await view(request, *args, **kwargs)
+                client = client_identity(request, await request.auser() if hasattr(request, "auser") else None)
+                fingerprint = hashlib.sha256(request.body).hexdigest()
+                deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+                record, created = await sync_to_async(claim)(scope, client, key[:255], fingerprint)
+                while not created:
+                    repeat = record and answer(record, fingerprint)
+                    if repeat:
+                        return repeat
+                    if record is None or time.monotonic() >= deadline:
+                        return in_progress()
+                    await asyncio.sleep(POLL_SECONDS)
+                    record = await sync_to_async(lookup)(scope, client, key[:255])
+                response = None
+                try:
+                    response = await view(request, *args, **kwargs)
+                finally:
+                    await sync_to_async(finish)(record, response)
+                return response
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                key = request.headers.get(HEADER)
+                if not key:
+                    return view(request, *args, **kwargs)
+                client = client_identity(request, getattr(request, "user", None))
+                fingerprint = hashlib.sha256(request.body).hexdigest()
+                deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+                record, created = claim(scope, client, key[:255], fingerprint)
+                while not created:
+                    repeat = record and answer(record, fingerprint)
+                    if repeat:
+                        return repeat
+                    if record is None or time.monotonic() >= deadline:
+                        return in_progress()
+                    time.sleep(POLL_SECONDS)
+                    record = lookup(scope, client, key[:255])
+                response = None
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    finish(record, response)
+                return response
+        return wrapper
+    return decorator
+
+
+def purge_idempotency_keys(batch_size=5000):
+    """Delete the keys past their window in batches and return how many were deleted."""
+    expired = IdempotencyKey.objects.filter(
+        created_at__lt=timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_HOURS)
+    )
+    purged = 0
+    while True:
+        ids = list(expired.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return purged
+        purged += IdempotencyKey.objects.filter(pk__in=ids).delete()[0]
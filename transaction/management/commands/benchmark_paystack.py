@@ -0,0 +1,121 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transaction import async_paystack, paystack
+
+
+class FakePaystack:
+    """A keep-alive HTTP/1.1 server on its own event loop that answers every call after a fixed delay."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.loop = asyncio.new_event_loop()
+        self.started = threading.Event()
+        self.port = None
+
+    def __enter__(self):
+        threading.Thread(target=self.run, daemon=True).start()
+        self.started.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(self.handle, "127.0.0.1", 0, backlog=4096))
+        self.port = server.sockets[0].getsockname()[1]
+        self.started.set()
+        self.loop.run_forever()
+
+    async def handle(self, reader, writer):
+        try:
+            while request_line := await reader.readline():
+                length = 0
+                while (header := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = header.decode().partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                reference = request_line.split()[1].decode().rstrip("/").rsplit("/", 1)[-1]
+                await asyncio.sleep(self.latency)
+                body = json.dumps({"status": True, "data": {
+                    "reference": reference, "status": "success", "authorization_url": "https://checkout.paystack.com/x",
+                }}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def summarize(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return (
+        f"{name:<28} {len(latencies) / elapsed:8.1f} calls/s {elapsed:7.2f} s total "
+        f"{statistics.median(latencies) * 1000:8.1f} ms p50 {p95 * 1000:8.1f} ms p95"
+    )
+
+
+class Command(BaseCommand):
+    help = "Compare the sync and async Paystack clients against a local fake Paystack with fixed latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=500)
+        parser.add_argument("--latency", type=float, default=0.2, help="Seconds the fake Paystack takes to answer.")
+        parser.add_argument("--threads", type=int, default=4, help="Threads of the sync worker, as gunicorn --threads.")
+
+    def handle(self, *args, **options):
+        calls, threads = options["calls"], options["threads"]
+        with FakePaystack(options["latency"]) as fake:
+            base_url = f"http://127.0.0.1:{fake.port}"
+            with mock.patch.object(paystack, "PAYSTACK_BASE_URL", base_url), \
+                    mock.patch.object(paystack, "_session", None), \
+                    mock.patch.object(async_paystack, "PAYSTACK_BASE_URL", base_url):
+                self.stdout.write(summarize(f"sync, {threads} threads", *self.run_sync(calls, threads)))
+                self.stdout.write(summarize("async, one event loop", *asyncio.run(self.run_async(calls))))
+        self.stdout.write(self.style.SUCCESS(f"{calls} verify calls each."))
+
+    @staticmethod
+    def timed(call, reference):
+        started = time.perf_counter()
+        response = call(reference)
+        return response, time.perf_counter() - started
+
+    def run_sync(self, calls, threads):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(lambda n: self.timed(paystack.verify_transaction, f"TRX-{n}"), range(calls)))
+        return self.latencies(results), time.perf_counter() - started
+
+    async def run_async(self, calls):
+        async def timed(reference):
+            started = time.perf_counter()
+            response = await async_paystack.averify_transaction(reference)
+            return response, time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(timed(f"TRX-{n}") for n in range(calls)))
+        finally:
+            await async_paystack.aclose_session()
+        return self.latencies(results), time.perf_counter() - started
+
+    @staticmethod
+    def latencies(results):
+        failed = [response for response, _ in results if not response.get("status")]
+        if failed:
+            raise CommandError(f"{len(failed)} calls failed, e.g. {failed[0]}")
+        return [elapsed for _, elapsed in results]
@@ -0,0 +1,59 @@
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from transaction import async_paystack
+from transaction.models import Transaction
+from transaction.reconciliation import reconcile_transactions
+
+from .benchmark_paystack import FakePaystack
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile a backlog of stale pending transactions against a local fake Paystack with fixed latency. "
+        "The transactions belong to a throwaway user and are deleted afterwards, other rows are not touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Pending transactions in the backlog.")
+        parser.add_argument("--latency", type=float, default=0.2, help="Seconds the fake Paystack takes to answer.")
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200])
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:12]
+        user = get_user_model().objects.create(username=f"bench-{tag}", email=f"bench-{tag}@example.com")
+        backlog = Transaction.objects.filter(user=user)
+        try:
+            with FakePaystack(options["latency"]) as fake, \
+                    mock.patch.object(async_paystack, "PAYSTACK_BASE_URL", f"http://127.0.0.1:{fake.port}"):
+                self.stdout.write(f"{'concurrency':>11} {'rows':>8} {'seconds':>8} {'rows/s':>8} {'errors':>7}")
+                for concurrency in options["concurrency"]:
+                    self.create_backlog(user, options["rows"], tag)
+                    stats = reconcile_transactions(
+                        older_than_minutes=1, chunk_size=options["chunk_size"], concurrency=concurrency,
+                        transactions=backlog,
+                    )
+                    self.stdout.write(
+                        f"{concurrency:>11} {stats['checked']:>8} {stats['seconds']:>8.1f} "
+                        f"{stats['checked'] / stats['seconds']:>8.0f} {stats['errors']:>7}"
+                    )
+                    backlog.delete()
+        finally:
+            backlog.delete()
+            user.delete()
+
+    @staticmethod
+    def create_backlog(user, rows, tag):
+        for start in range(0, rows, 10000):
+            Transaction.objects.bulk_create(
+                Transaction(user=user, reference=f"BENCH-{tag}-{n}", amount=100)
+                for n in range(start, min(start + 10000, rows))
+            )
+        # Older than the reconciliation cutoff.
+        Transaction.objects.filter(user=user).update(created_at=timezone.now() - timedelta(hours=1))
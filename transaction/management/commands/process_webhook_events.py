@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from transaction.webhooks import process_webhook_events
+
+
+class Command(BaseCommand):
+    help = "Apply the stored Paystack webhook events to their transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the inbox")
+        parser.add_argument("--interval", type=float, default=1, help="Seconds to wait when the inbox is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_webhook_events(batch_size=options["batch_size"])
+            if processed:
+                self.stdout.write(f"Processed {processed} webhook events.")
+            if not options["loop"]:
+                break
+            if not processed:
+                time.sleep(options["interval"])
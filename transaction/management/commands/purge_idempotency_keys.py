@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from transaction.idempotency import purge_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Key records older than IDEMPOTENCY_KEY_HOURS, run it on a schedule."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        purged = purge_idempotency_keys(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} idempotency keys."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from transaction.reconciliation import reconcile_transactions
+
+
+class Command(BaseCommand):
+    help = "Verify stale pending Paystack transactions and settle them, run it on a schedule."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, help="Minutes pending, PAYSTACK_RECONCILE_AFTER_MINUTES by default.")
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, help="Verify calls in flight, PAYSTACK_RECONCILE_CONCURRENCY by default.")
+        parser.add_argument("--limit", type=int, help="Stop after this many transactions.")
+
+    def handle(self, *args, **options):
+        stats = reconcile_transactions(
+            older_than_minutes=options["older_than"],
+            chunk_size=options["chunk_size"],
+            concurrency=options["concurrency"],
+            limit=options["limit"],
+        )
+        rate = stats["checked"] / stats["seconds"] if stats["seconds"] else 0
+        self.stdout.write(
+            f"Checked {stats['checked']} transactions in {stats['seconds']:.1f} s ({rate:.0f}/s): "
+            f"{stats['success']} succeeded, {stats['failed']} failed, {stats['pending']} still pending, "
+            f"{stats['errors']} errors."
+        )
+        self.stdout.write(self.style.SUCCESS("Reconciliation finished."))
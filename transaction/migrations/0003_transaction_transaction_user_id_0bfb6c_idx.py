@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0002_alter_payout_amount_alter_payout_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'status', 'created_at'], name='transaction_user_id_0bfb6c_idx'),
+        ),
+    ]
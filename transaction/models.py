@@ -46,6 +46,12 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status', 'created_at']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
     def __str__(self):
         return f"Transaction {self.reference}: {self.user.email} - {self.amount} - {self.status}"
 
@@ -54,3 +60,38 @@ class Transaction(models.Model):
         if not self.reference:
             self.reference = f"TRX-{uuid.uuid4().hex[:12].upper()}"
         super().save(*args, **kwargs)
+
+
+class WebhookEvent(models.Model):
+    """Paystack webhook delivery stored as received, applied to transactions in batches off the request path."""
+    key = models.CharField(max_length=150, unique=True)  # event and Paystack id, redeliveries share it
+    event = models.CharField(max_length=50)
+    payload = models.TextField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], name='webhook_event_unprocessed_idx', condition=models.Q(processed_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"Webhook {self.key}"
+
+
+class IdempotencyKey(models.Model):
+    """Response of a request sent with an Idempotency-Key header, replayed to repeats within the window."""
+    scope = models.CharField(max_length=50)  # the endpoint the key was used on
+    client = models.CharField(max_length=64, default='')  # user:<pk>, or ip:<address> for anonymous requests
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # sha256 of the request body
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # null while the first request runs
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['scope', 'client', 'key'], name='unique_idempotency_key')]
+        indexes = [models.Index(fields=['created_at'])]
+
+    def __str__(self):
+        return f"Idempotency key {self.scope}:{self.client}:{self.key}"
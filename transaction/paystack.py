@@ -1,35 +1,137 @@
 import requests
 import os
 import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
 # Load Paystack Secret Key from environment variables
 PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY")
-PAYSTACK_BASE_URL = "https://api.paystack.co"
+PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
 
 if not PAYSTACK_SECRET_KEY:
     logger.error("PAYSTACK_SECRET_KEY is not set. Ensure it is properly configured in the environment.")
 
+# Connections kept open per worker process, one per thread calling Paystack at the same time
+POOL_SIZE = int(os.getenv("PAYSTACK_POOL_SIZE", 10))
+# (connect, read) timeouts in seconds per endpoint, a worker never waits longer than this per attempt
+DEFAULT_TIMEOUT = (3.05, 10)
+TIMEOUTS = {
+    "/transaction/initialize": (3.05, 15),
+    "/transaction/verify": (3.05, 10),
+}
+# Attempts for idempotent (GET) calls, POSTs are sent once so a payment is never initialized twice
+MAX_ATTEMPTS = int(os.getenv("PAYSTACK_MAX_ATTEMPTS", 3))
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 2.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET"}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_metrics = defaultdict(lambda: {"requests": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+_metrics_lock = threading.Lock()
+
+
+def get_session():
+    """The process's pooled keep-alive session, recreated in a forked worker."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                # Threads share the session, nothing may be kept between their requests.
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                session.headers.update({
+                    "Authorization": f"Bearer {PAYSTACK_SECRET_KEY}",
+                    "Content-Type": "application/json",
+                })
+                _session, _session_pid = session, pid
+    return _session
+
+
+def endpoint_label(endpoint):
+    """The endpoint without path parameters, e.g. /transaction/verify for /transaction/verify/<reference>."""
+    return "/" + "/".join(endpoint.strip("/").split("/")[:2])
+
+
+def get_timeout(endpoint):
+    return TIMEOUTS.get(endpoint_label(endpoint), DEFAULT_TIMEOUT)
+
+
+def backoff(attempt):
+    """Full jitter: a random wait up to the exponential backoff, so retrying workers spread out."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def record(label, seconds, error=False, retried=False):
+    with _metrics_lock:
+        counters = _metrics[label]
+        counters["requests"] += 1
+        counters["errors"] += error
+        counters["retries"] += retried
+        counters["total_seconds"] += seconds
+        counters["max_seconds"] = max(counters["max_seconds"], seconds)
+
+
+def metrics(reset=False):
+    """Request, error and retry counts and latency per endpoint since start (or the last reset)."""
+    with _metrics_lock:
+        snapshot = {
+            label: dict(counters, average_seconds=counters["total_seconds"] / counters["requests"])
+            for label, counters in _metrics.items()
+        }
+        if reset:
+            _metrics.clear()
+    return snapshot
+
+
+def send(method, endpoint, payload=None):
+    """Send the request, retrying idempotent calls on connection errors, timeouts and 429/5xx answers."""
+    label = endpoint_label(endpoint)
+    attempts = MAX_ATTEMPTS if method in IDEMPOTENT_METHODS else 1
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        started = time.perf_counter()
+        try:
+            response = get_session().request(
+                method, f"{PAYSTACK_BASE_URL}{endpoint}", json=payload, timeout=get_timeout(endpoint)
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            record(label, time.perf_counter() - started, error=True, retried=not last)
+            if last:
+                raise
+            logger.warning(f"Paystack {method} {label} attempt {attempt + 1} failed: {e}")
+        else:
+            failed = response.status_code in RETRY_STATUSES
+            record(label, time.perf_counter() - started, error=response.status_code >= 400, retried=failed and not last)
+            if not failed or last:
+                return response
+            logger.warning(f"Paystack {method} {label} attempt {attempt + 1} returned {response.status_code}")
+        time.sleep(backoff(attempt))
+
+
 # General function to make API requests
 def make_request(method, endpoint, payload=None):
     """Helper function to make requests to Paystack API."""
-    url = f"{PAYSTACK_BASE_URL}{endpoint}"
-    headers = {
-        "Authorization": f"Bearer {PAYSTACK_SECRET_KEY}",
-        "Content-Type": "application/json"
-    }
+    if method not in ("GET", "POST"):
+        logger.error(f"Unsupported request method: {method}")
+        return {"status": False, "message": "Invalid request method"}
 
     try:
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, json=payload, headers=headers)
-        else:
-            logger.error(f"Unsupported request method: {method}")
-            return {"status": False, "message": "Invalid request method"}
-
+        response = send(method, endpoint, payload)
         response_data = response.json()
 
         if response.status_code in [200, 201] and response_data.get("status"):
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .async_paystack import aclose_session, averify_transaction
+from .models import Transaction, TransactionStatus
+
+logger = logging.getLogger(__name__)
+
+# Paystack transaction statuses that settle a pending transaction, the others leave it pending
+SETTLED_STATUSES = {
+    "success": TransactionStatus.SUCCESS,
+    "failed": TransactionStatus.FAILED,
+    "abandoned": TransactionStatus.FAILED,
+    "reversed": TransactionStatus.FAILED,
+}
+
+
+def pending_chunk(cutoff, after, chunk_size, transactions=None):
+    """The next chunk of pending transactions created before cutoff, keyset-paginated on (created_at, id)."""
+    transactions = Transaction.objects.all() if transactions is None else transactions
+    pending = transactions.filter(status=TransactionStatus.PENDING, created_at__lt=cutoff)
+    if after is not None:
+        created_at, pk = after
+        pending = pending.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+    return list(pending.order_by('created_at', 'pk').values_list('pk', 'reference', 'created_at')[:chunk_size])
+
+
+def settle(changes):
+    """Write the settled statuses with one UPDATE per status, skipping rows settled meanwhile."""
+    now = timezone.now()
+    for status, ids in changes.items():
+        if ids:
+            Transaction.objects.filter(pk__in=ids, status=TransactionStatus.PENDING).update(status=status, updated_at=now)
+
+
+async def verify_chunk(references, semaphore):
+    """Paystack's status for each reference, None where the call failed or the answer is malformed."""
+    async def verify(reference):
+        async with semaphore:
+            response = await averify_transaction(reference)
+        data = response.get("data") if response.get("status") else None
+        status = data.get("status") if isinstance(data, dict) else None
+        return status if isinstance(status, str) else None
+
+    return await asyncio.gather(*(verify(reference) for reference in references))
+
+
+async def areconcile_transactions(older_than_minutes=None, chunk_size=500, concurrency=None, limit=None, transactions=None):
+    """
+    Verify pending transactions older than older_than_minutes with Paystack and settle the resolved ones.
+
+    transactions narrows the run to a queryset, every transaction is considered by default.
+
+    Chunks are read and written on the database thread while at most concurrency verify
+    calls are in flight. Returns the counts and the elapsed seconds.
+    """
+    older_than_minutes = older_than_minutes or settings.PAYSTACK_RECONCILE_AFTER_MINUTES
+    semaphore = asyncio.Semaphore(concurrency or settings.PAYSTACK_RECONCILE_CONCURRENCY)
+    cutoff = timezone.now() - timedelta(minutes=older_than_minutes)
+    stats = {"checked": 0, "success": 0, "failed": 0, "pending": 0, "errors": 0}
+    started = time.perf_counter()
+    after = None
+    try:
+        while limit is None or stats["checked"] < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - stats["checked"])
+            chunk = await sync_to_async(pending_chunk)(cutoff, after, size, transactions)
+            if not chunk:
+                break
+            after = (chunk[-1][2], chunk[-1][0])
+            statuses = await verify_chunk([reference for _, reference, _ in chunk], semaphore)
+
+            changes = {TransactionStatus.SUCCESS: [], TransactionStatus.FAILED: []}
+            for (pk, _, _), status in zip(chunk, statuses):
+                if status is None:
+                    stats["errors"] += 1
+                elif status in SETTLED_STATUSES:
+                    changes[SETTLED_STATUSES[status]].append(pk)
+                    stats[SETTLED_STATUSES[status]] += 1
+                else:
+                    stats["pending"] += 1
+            await sync_to_async(settle)(changes)
+            stats["checked"] += len(chunk)
+    finally:
+        await aclose_session()
+    stats["seconds"] = time.perf_counter() - started
+    logger.info(f"Reconciled Paystack transactions: {stats}")
+    return stats
+
+
+def reconcile_transactions(**kwargs):
+    """Run reconciliation to completion, for the management command and schedulers."""
+    return asyncio.run(areconcile_transactions(**kwargs))
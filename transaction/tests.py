@@ -1,3 +1,236 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.models import User
+
+from . import async_paystack, paystack, reconciliation, views, webhooks
+from .models import IdempotencyKey, WebhookEvent
+
+
+class StubPaystack(BaseHTTPRequestHandler):
+    """Answers like Paystack, the reference picks the behaviour: ok, flaky (503 twice), slow, down (always 503)."""
+    protocol_version = "HTTP/1.1"
+    calls = {}
+    clients = set()
+    slow_seconds = 1.0
+
+    def do_GET(self):
+        self.clients.add(self.client_address)
+        reference = self.path.rstrip("/").rsplit("/", 1)[-1]
+        self.__class__.calls[reference] = calls = self.calls.get(reference, 0) + 1
+        if reference == "slow":
+            time.sleep(self.slow_seconds)
+        if reference == "down" or (reference == "flaky" and calls <= 2):
+            return self.answer(503, {"status": False, "message": "Service unavailable"})
+        self.answer(200, {"status": True, "data": {"reference": reference, "status": "success"}})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.__class__.calls["initialize"] = self.calls.get("initialize", 0) + 1
+        self.answer(503, {"status": False, "message": "Service unavailable"})
+
+    def answer(self, status, body):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        try:
+            self.wfile.write(content)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out and went away first.
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PaystackClientTests(SimpleTestCase):
+    """The pooled Paystack client against a local stub server with slow and failing responses."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubPaystack)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        patcher = mock.patch.multiple(
+            paystack,
+            PAYSTACK_BASE_URL=f"http://127.0.0.1:{self.server.server_port}",
+            TIMEOUTS={"/transaction/verify": (1, 0.3)},
+            BACKOFF_BASE=0.01,
+            _session=None,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        StubPaystack.calls.clear()
+        StubPaystack.clients.clear()
+        paystack.metrics(reset=True)
+
+    def test_calls_reuse_one_pooled_connection(self):
+        for _ in range(5):
+            response = paystack.verify_transaction("ok")
+        self.assertIs(response.get("status"), True)
+        self.assertEqual(len(StubPaystack.clients), 1)
+
+    def test_get_is_retried(self):
+        response = paystack.verify_transaction("flaky")
+        self.assertIs(response.get("status"), True)
+        self.assertEqual(StubPaystack.calls["flaky"], 3)
+        self.assertEqual(paystack.metrics()["/transaction/verify"]["retries"], 2)
+
+    def test_get_gives_up_after_max_attempts(self):
+        response = paystack.verify_transaction("down")
+        self.assertIs(response.get("status"), False)
+        self.assertEqual(StubPaystack.calls["down"], paystack.MAX_ATTEMPTS)
+
+    def test_slow_read_times_out(self):
+        started = time.perf_counter()
+        response = paystack.verify_transaction("slow")
+        self.assertIs(response.get("status"), False)
+        self.assertLess(time.perf_counter() - started, StubPaystack.slow_seconds * paystack.MAX_ATTEMPTS)
+
+    def test_post_is_never_retried(self):
+        response = paystack.initialize_transaction("customer@example.com", 100)
+        self.assertIs(response.get("status"), False)
+        self.assertEqual(StubPaystack.calls["initialize"], 1)
+
+    def test_concurrent_threads_share_the_session(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(paystack.verify_transaction("ok"))) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(result.get("status") for result in results))
+
+        StubPaystack.clients.clear()
+        for _ in range(5):
+            paystack.verify_transaction("ok")
+        self.assertEqual(len(StubPaystack.clients), 1)
+
+
+class AsyncPaystackClientTests(SimpleTestCase):
+    """Bodies that are not a JSON object come back as the usual failure dict."""
+
+    def test_non_object_bodies(self):
+        for body in (["status"], "Bad gateway", None):
+            with self.subTest(body):
+                with mock.patch.object(async_paystack, "asend", mock.AsyncMock(return_value=(200, body))):
+                    response = asyncio.run(async_paystack.averify_transaction("ref-1"))
+                self.assertIs(response["status"], False)
+                self.assertEqual(response["details"], body)
+
+
+class ReconciliationTests(SimpleTestCase):
+    """A malformed verify answer is an error for its own reference, the rest of the chunk still settles."""
+
+    def test_malformed_responses(self):
+        answers = {
+            "ok": {"status": True, "data": {"status": "success"}},
+            "no-data": {"status": True},
+            "list-data": {"status": True, "data": ["success"]},
+            "list-status": {"status": True, "data": {"status": ["success"]}},
+            "failed-call": {"status": False, "message": "Paystack API request failed"},
+        }
+
+        async def averify_transaction(reference):
+            return answers[reference]
+
+        with mock.patch.object(reconciliation, "averify_transaction", averify_transaction):
+            statuses = asyncio.run(reconciliation.verify_chunk(list(answers), asyncio.Semaphore(2)))
+        self.assertEqual(statuses, ["success", None, None, None, None])
+
+
+@mock.patch.object(webhooks, "PAYSTACK_SECRET_KEY", "test-secret")
+class PaystackWebhookTests(TestCase):
+    """Signed deliveries are stored once, anything that is not an event object is refused."""
+
+    def deliver(self, payload):
+        body = json.dumps(payload).encode()
+        signature = hmac.new(b"test-secret", body, hashlib.sha512).hexdigest()
+        return self.client.post(
+            reverse("paystack-webhook"), body, content_type="application/json", HTTP_X_PAYSTACK_SIGNATURE=signature
+        )
+
+    def test_event_is_stored_once(self):
+        event = {"event": "charge.success", "data": {"id": 1, "reference": "ref-1"}}
+        self.assertEqual(self.deliver(event).status_code, 200)
+        self.assertEqual(self.deliver(event).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_malformed_events_are_refused(self):
+        for payload in ({"event": "charge.success", "data": ["ref-1"]}, {"event": ["charge.success"]}, ["charge.success"], {}):
+            with self.subTest(payload):
+                self.assertEqual(self.deliver(payload).status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+
+class IdempotencyKeyTests(APITestCase):
+    """Keys belong to the client that sent them, and a Paystack failure does not hold its key."""
+
+    payment = {"email": "customer@example.com", "amount": 100}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(email="alice@example.com", username="alice", password="secret")
+        cls.bob = User.objects.create_user(email="bob@example.com", username="bob", password="secret")
+
+    def initialize(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse("paystack-initialize"), self.payment, format="json", HTTP_IDEMPOTENCY_KEY="order-1")
+
+    @mock.patch.object(views, "initialize_transaction")
+    def test_clients_do_not_share_keys(self, initialize):
+        initialize.side_effect = lambda email, amount: {"status": True, "data": {"reference": f"ref-{initialize.call_count}"}}
+        first = self.initialize(self.alice)
+        self.assertEqual(self.initialize(self.alice).json(), first.json())
+        self.assertNotEqual(self.initialize(self.bob).json(), first.json())
+        self.assertEqual(initialize.call_count, 2)
+
+    @mock.patch.object(views, "initialize_transaction")
+    def test_paystack_failure_frees_the_key(self, initialize):
+        initialize.return_value = {"status": False, "message": "Paystack API request failed"}
+        self.assertEqual(self.initialize(self.alice).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        initialize.return_value = {"status": True, "data": {"reference": "ref-1"}}
+        self.assertEqual(self.initialize(self.alice).status_code, 200)
+        self.assertEqual(initialize.call_count, 2)
+
+    async def test_async_views_authenticate_bearer_tokens(self):
+        async def ainitialize_transaction(email, amount):
+            return {"status": True, "data": {"reference": "ref-1"}}
+
+        token = AccessToken.for_user(self.alice)
+        with mock.patch.object(views, "ainitialize_transaction", ainitialize_transaction):
+            response = await self.async_client.post(
+                reverse("paystack-async-initialize"), self.payment, content_type="application/json",
+                headers={"Authorization": f"Bearer {token}", "Idempotency-Key": "order-1"},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await IdempotencyKey.objects.aget()).client, f"user:{self.alice.pk}")
+
+        response = await self.async_client.post(
+            reverse("paystack-async-initialize"), self.payment, content_type="application/json",
+            headers={"Authorization": "Bearer not-a-token"},
+        )
+        self.assertEqual(response.status_code, 401)
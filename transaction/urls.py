@@ -1,6 +1,10 @@
 from django.urls import path
 from .views import (
+    async_initialize_payment_view,
+    async_payment_init_view,
+    async_verify_payment_view,
     initialize_payment_view,
+    paystack_webhook,
     PaystackPaymentInitView,
     verify_payment_view
 )
@@ -14,4 +18,12 @@ urlpatterns = [
 
     # Payment verification endpoint
     path("paystack/verify/<str:reference>/", verify_payment_view, name="paystack-verify"),
+
+    # Paystack webhook, events are stored and applied by process_webhook_events
+    path("paystack/webhook/", paystack_webhook, name="paystack-webhook"),
+
+    # Async versions of the endpoints above, served without blocking a worker under ASGI
+    path("paystack/async/init/", async_initialize_payment_view, name="paystack-async-initialize"),
+    path("paystack/async/init-class/", async_payment_init_view, name="paystack-async-initialize-class"),
+    path("paystack/async/verify/<str:reference>/", async_verify_payment_view, name="paystack-async-verify"),
 ]
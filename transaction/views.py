@@ -1,13 +1,24 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import api_view
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from .models import Transaction
 from user.models import User  # Ensure your custom User model is properly referenced
+from .async_paystack import ainitialize_transaction, averify_transaction
+from .idempotency import idempotent, not_replayed
 from .paystack import initialize_transaction, verify_transaction
 from .serializers import PaystackPaymentSerializer, TransactionSerializer
+from .webhooks import store_event, valid_signature
+import json
 import logging
 
 # Initialize logger
@@ -16,6 +27,7 @@ logger = logging.getLogger(__name__)
 class PaystackPaymentInitView(APIView):
     """Initialize Paystack Payment"""
 
+    @method_decorator(idempotent("paystack-initialize-class"))
     def post(self, request):
         serializer = PaystackPaymentSerializer(data=request.data)
         if not serializer.is_valid():
@@ -48,10 +60,10 @@ class PaystackPaymentInitView(APIView):
                     "transaction": TransactionSerializer(transaction).data
                 }, status=status.HTTP_200_OK)
 
-            return Response({
+            return not_replayed(Response({
                 "error": "Paystack transaction initialization failed",
                 "details": response
-            }, status=status.HTTP_400_BAD_REQUEST)
+            }, status=status.HTTP_400_BAD_REQUEST))
 
         except Exception as e:
             logger.error(f"Error initializing Paystack transaction: {str(e)}")
@@ -59,6 +71,7 @@ class PaystackPaymentInitView(APIView):
 
 
 @api_view(["POST"])
+@idempotent("paystack-initialize")
 def initialize_payment_view(request):
     """Function-based view to initialize Paystack payment"""
 
@@ -76,7 +89,7 @@ def initialize_payment_view(request):
             return JsonResponse(response, status=200)
 
         logger.warning(f"Failed to initialize transaction for {email}: {response}")
-        return JsonResponse({"error": "Paystack transaction failed", "details": response}, status=400)
+        return not_replayed(JsonResponse({"error": "Paystack transaction failed", "details": response}, status=400))
 
     except Exception as e:
         logger.error(f"Error initializing transaction: {str(e)}")
@@ -112,26 +125,152 @@ def verify_payment_view(request, reference):
         return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(["POST"])
+@csrf_exempt
+@require_POST
 def paystack_webhook(request):
-    """Handle Paystack Webhook Events"""
+    """Store a signed Paystack webhook event and acknowledge it, process_webhook_events applies it"""
+    if not valid_signature(request.body, request.headers.get("x-paystack-signature")):
+        logger.warning("Paystack webhook rejected: invalid signature")
+        return JsonResponse({"error": "Invalid signature"}, status=401)
+
+    if not store_event(request.body):
+        return JsonResponse({"error": "Invalid event"}, status=400)
+    return JsonResponse({"status": "success"}, status=200)
+
+
+# Async versions of the views above, for the ASGI server: a worker keeps serving other
+# requests while these wait on Paystack. DRF views are sync, so these are plain Django views
+# and bearer_auth gives them the JWT authentication the DRF views get from REST_FRAMEWORK.
+
+def parse_json(request):
     try:
-        data = request.data
-        event = data.get("event")
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return None
 
-        if event == "charge.success":
-            reference = data["data"]["reference"]
-            transaction = Transaction.objects.filter(reference=reference).first()
 
-            if transaction:
-                transaction.status = "success"
-                transaction.save()
-                logger.info(f"Transaction {reference} marked as successful via webhook")
-            else:
-                logger.warning(f"Webhook received for unknown transaction reference: {reference}")
+def bearer_auth(view):
+    """Authenticate a JWT bearer token like the DRF views do, requests without one keep the session user."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        authenticator = JWTAuthentication()
+        try:
+            authenticated = await sync_to_async(authenticator.authenticate)(request)
+        except AuthenticationFailed as e:
+            return JsonResponse(
+                {"detail": str(e.detail)}, status=401, headers={"WWW-Authenticate": authenticator.authenticate_header(request)}
+            )
+        if authenticated is not None:
+            user = request.user = authenticated[0]
+
+            async def auser():
+                return user
+            request.auser = auser
+        return await view(request, *args, **kwargs)
+    return wrapper
 
-        return Response({"status": "success"}, status=status.HTTP_200_OK)
+
+@csrf_exempt
+@require_POST
+@bearer_auth
+@idempotent("paystack-initialize")
+async def async_initialize_payment_view(request):
+    """Async initialize_payment_view"""
+    serializer = PaystackPaymentSerializer(data=parse_json(request))
+    if not serializer.is_valid():
+        return JsonResponse({"error": "Invalid request data", "details": serializer.errors}, status=400)
+
+    email = serializer.validated_data["email"]
+    amount = serializer.validated_data["amount"]
+
+    try:
+        response = await ainitialize_transaction(email, amount)
+        if response.get("status"):
+            logger.info(f"Paystack transaction initialized for {email}")
+            return JsonResponse(response, status=200)
+
+        logger.warning(f"Failed to initialize transaction for {email}: {response}")
+        return not_replayed(JsonResponse({"error": "Paystack transaction failed", "details": response}, status=400))
 
     except Exception as e:
-        logger.error(f"Error handling Paystack webhook: {str(e)}")
-        return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        logger.error(f"Error initializing transaction: {str(e)}")
+        return JsonResponse({"error": "Internal server error"}, status=500)
+
+
+@csrf_exempt
+@require_POST
+@bearer_auth
+@idempotent("paystack-initialize-class")
+async def async_payment_init_view(request):
+    """Async PaystackPaymentInitView"""
+    data = parse_json(request)
+    serializer = PaystackPaymentSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    email = serializer.validated_data["email"]
+    amount = serializer.validated_data["amount"]
+    user_id = data.get("user_id")
+
+    if not user_id:
+        return JsonResponse({"error": "user_id is required"}, status=400)
+
+    try:
+        user = await User.objects.aget(id=user_id)
+    except (User.DoesNotExist, ValueError):
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    try:
+        response = await ainitialize_transaction(email, amount)
+
+        if response.get("status"):
+            transaction = await Transaction.objects.acreate(
+                user=user,
+                reference=response["data"]["reference"],
+                amount=amount,
+                status="pending"
+            )
+            return JsonResponse({
+                "message": "Transaction initialized",
+                "authorization_url": response["data"]["authorization_url"],
+                "transaction": TransactionSerializer(transaction).data
+            }, status=200)
+
+        return not_replayed(JsonResponse({
+            "error": "Paystack transaction initialization failed",
+            "details": response
+        }, status=400))
+
+    except Exception as e:
+        logger.error(f"Error initializing Paystack transaction: {str(e)}")
+        return JsonResponse({"error": "Internal server error"}, status=500)
+
+
+@require_GET
+@bearer_auth
+async def async_verify_payment_view(request, reference):
+    """Async verify_payment_view"""
+    try:
+        transaction = await Transaction.objects.select_related("user").aget(reference=reference)
+    except Transaction.DoesNotExist:
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    try:
+        response = await averify_transaction(reference)
+
+        transaction.status = "success" if response.get("status") and response["data"]["status"] == "success" else "failed"
+        await transaction.asave(update_fields=["status", "updated_at"])
+        if transaction.status == "success":
+            return JsonResponse({
+                "message": "Payment verified successfully",
+                "transaction": TransactionSerializer(transaction).data
+            }, status=200)
+
+        return JsonResponse({
+            "error": "Payment verification failed",
+            "details": response
+        }, status=400)
+
+    except Exception as e:
+        logger.error(f"Error verifying transaction {reference}: {str(e)}")
+        return JsonResponse({"error": "Internal server error"}, status=500)
@@ -0,0 +1,86 @@
+import hashlib
+import hmac
+import json
+import logging
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Transaction, TransactionStatus, WebhookEvent
+from .paystack import PAYSTACK_SECRET_KEY
+
+logger = logging.getLogger(__name__)
+
+# Webhook events that settle a transaction, the others are stored and marked processed
+EVENT_STATUSES = {
+    "charge.success": TransactionStatus.SUCCESS,
+}
+
+
+def valid_signature(body, signature):
+    """Paystack signs the raw body with HMAC-SHA512 of the secret key in x-paystack-signature."""
+    if not PAYSTACK_SECRET_KEY or not signature:
+        return False
+    expected = hmac.new(PAYSTACK_SECRET_KEY.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def store_event(body):
+    """
+    Append the delivery to the inbox with one INSERT, dropping redeliveries of an event already stored.
+
+    Returns False when the body is not a Paystack event.
+    """
+    try:
+        text = body.decode()
+        payload = json.loads(text)
+        event, data = payload["event"], payload.get("data") or {}
+    except (ValueError, KeyError, TypeError):
+        return False
+    if not isinstance(event, str) or not isinstance(data, dict):
+        return False
+    key = f"{event}:{data.get('id') or data.get('reference')}"
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(key=key[:150], event=event[:50], payload=text)], ignore_conflicts=True
+    )
+    return True
+
+
+def apply_events(events):
+    """Settle the events' transactions with one UPDATE per status, applying an event twice changes nothing."""
+    references = defaultdict(set)
+    for event in events:
+        status = EVENT_STATUSES.get(event.event)
+        reference = (json.loads(event.payload).get("data") or {}).get("reference")
+        if status and reference:
+            references[status].add(reference)
+
+    now = timezone.now()
+    for status, batch in references.items():
+        updated = Transaction.objects.filter(reference__in=batch).exclude(status=status).update(status=status, updated_at=now)
+        logger.info(f"{len(batch)} webhook references marked {status}, {updated} changed")
+    received = set().union(*references.values())
+    unknown = received - set(Transaction.objects.filter(reference__in=received).values_list('reference', flat=True))
+    if unknown:
+        logger.warning(f"Webhook received for unknown transaction references: {sorted(unknown)}")
+
+
+def process_webhook_events(batch_size=1000, max_batches=None):
+    """Apply stored webhook events in batches and return how many were handled."""
+    processed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            pending = WebhookEvent.objects.filter(processed_at__isnull=True).order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Several processors can drain the inbox side by side.
+                pending = pending.select_for_update(skip_locked=True)
+            events = list(pending[:batch_size])
+            if not events:
+                break
+            apply_events(events)
+            WebhookEvent.objects.filter(pk__in=[event.pk for event in events]).update(processed_at=timezone.now())
+        processed += len(events)
+        batches += 1
+    return processed